@@ -1,3 +1,92 @@
+import random
+import time
+from array import array
+from itertools import compress
+
+ROWS, COLUMNS = 16, 4
+FULL = (1 << ROWS * COLUMNS) - 1
+FIRST_CELLS = sum(1 << i * COLUMNS for i in range(ROWS))
+LAST_CELLS = FIRST_CELLS << COLUMNS - 1
+# (step in bits between the cells of a line, cells where a line may start):
+# around the board, up a stack, and the two diagonals
+LINES = ((COLUMNS, FULL), (1, FIRST_CELLS), (COLUMNS + 1, FIRST_CELLS),
+         (COLUMNS - 1, LAST_CELLS))
+
+
+def _rotate(bits: int, shift: int) -> int:
+    """
+    (int, int) -> int
+
+    Rotates the 64 bits of a bitboard, so that bit k + shift comes to bit k.
+    The board is a cylinder, so the rows wrap around.
+
+    >>> _rotate(0b10, 1), _rotate(1, 1) == 1 << 63
+    (1, True)
+    """
+    return (bits >> shift | bits << ROWS * COLUMNS - shift) & FULL
+
+
+def encode_board(board: list[list]) -> tuple[int, int]:
+    """
+    (list) -> tuple
+
+    Returns the green and the white bitboards of the board.
+    The cell board[i][j] is the bit i * 4 + j.
+
+    >>> encode_board([['g', 'w', 0, 0]] + [[0, 0, 0, 0]] * 15)
+    (1, 2)
+    """
+    green = white = 0
+    for i, row in enumerate(board):
+        for j, el in enumerate(row):
+            if el == 'g':
+                green |= 1 << i * COLUMNS + j
+            elif el == 'w':
+                white |= 1 << i * COLUMNS + j
+    return green, white
+
+
+def winning_starts(bits: int) -> list[int]:
+    """
+    (int) -> list
+
+    Returns the cells where 4 equal pieces of a bitboard start a line,
+    as a bitboard for every direction of LINES.
+
+    >>> winning_starts(0b1111)
+    [0, 1, 0, 0]
+    """
+    starts = []
+    for step, first in LINES:
+        pairs = bits & _rotate(bits, step)
+        starts.append(pairs & _rotate(pairs, 2 * step) & first)
+    return starts
+
+
+# the (column, row) positions of the line that starts at every cell,
+# for every direction of LINES
+LINE_CELLS = tuple(tuple(tuple(((start + k * step) % COLUMNS,
+                                (start + k * step) % (ROWS * COLUMNS) // COLUMNS)
+                               for k in range(4))
+                         for start in range(ROWS * COLUMNS))
+                   for step, _ in LINES)
+
+
+def _positions(starts: list[int]) -> list[list[tuple]]:
+    """
+    (list) -> list
+
+    Turns line starts into lists of (column, row) positions of the cells.
+    """
+    lines = []
+    for cells, line in zip(LINE_CELLS, starts):
+        while line:
+            bit = line & -line
+            lines.append(list(cells[bit.bit_length() - 1]))
+            line ^= bit
+    return lines
+
+
 def winning_combination(board: list[list]) -> bool:
     """
     (list) -> bool
@@ -5,6 +94,11 @@ def winning_combination(board: list[list]) -> bool:
     Checks for winning combinations on the board.
     Returns a bool value of True and all winning positions if there is winning combination or False if not.
 
+    A winning combination is 4 pieces of the same colour in a line: around
+    the board (the rows wrap, the board is a cylinder), along a row or
+    diagonally. The board is kept as two 64-bit bitboards and every kind
+    of line is found for all cells at once with shifts and masks.
+
     >>> winning_combination([['w', 'g', 'g', 'w'], [0, 0, 0, 0], [0, 'g', 'w', 'g'], \
 ['g', 'w', 'w', 'w'], [0, 0, 0, 'g'], [0, 0, 0, 0], [0, 0, 0, 'w'], [0, 0, 0, 0], \
 [0, 0, 'w', 'w'], ['w', 'g', 'w', 'g'], [0, 0, 0, 'w'], [0, 0, 0, 'g'], [0, 0, 'g', 'w'], \
@@ -18,7 +112,11 @@ def winning_combination(board: list[list]) -> bool:
 [(3, 15), (3, 0), (3, 1), (3, 2)]])
     
     """
-    pass
+    green, white = encode_board(board)
+    starts = [g | w for g, w in zip(winning_starts(green), winning_starts(white))]
+    if not any(starts):
+        return False
+    return True, _positions(starts)
 
 def board_generation() -> list[list]:
     """
@@ -31,5 +129,175 @@ def board_generation() -> list[list]:
           [0, 'g', 'g', 'w'], [0, 0, 0, 0], ['w', 'g', 'w', 'w'], [0, 0, 0, 'g'],
           [0, 0, 0, 'g'], ['w', 'g', 'g', 'w'], [0, 'w', 'w', 'w'], [0, 0, 'g', 'w']]
 
+    The pieces of a row are stacked at its end, as in the example.
+    """
+    board = []
+    for _ in range(ROWS):
+        height = random.randint(0, COLUMNS)
+        board.append([0] * (COLUMNS - height) + random.choices(['g', 'w'], k=height))
+    return board
+
+
+def board_generation_batch(count: int) -> list[list[list]]:
+    """
+    (int) -> list
+
+    Generates count boards of board_generation, i.e. a count x 16 x 4 list.
+    """
+    return [board_generation() for _ in range(count)]
+
+
+def _lane_mask(mask: int, count: int) -> int:
+    """
+    (int, int) -> int
+
+    Repeats a 64-bit mask in count lanes of 64 bits.
+
+    >>> hex(_lane_mask(0xf, 2))
+    '0xf000000000000000f'
+    """
+    return int.from_bytes(mask.to_bytes(8, 'little') * count, 'little')
+
+
+class _RowCells(dict):
+    """
+    Maps a row of 4 cells (as a tuple) to its cells as bytes, b'g', b'w'
+    or b'0' per cell. Rows with other values are added on the first use,
+    with the other values as empty cells; rows of another length raise
+    ValueError and are not added.
+    """
+
+    def __missing__(self, row: tuple) -> bytes:
+        if len(row) != COLUMNS:
+            raise ValueError(f"boards must be {ROWS} x {COLUMNS}")
+        cells = bytes(ord(el) if el in ('g', 'w') else ord('0') for el in row)
+        self[row] = cells
+        return cells
+
+
+ROW_CELLS = _RowCells()
+GREEN_BITS = bytes.maketrans(b'gw0', b'100')
+WHITE_BITS = bytes.maketrans(b'gw0', b'010')
+
+
+def encode_boards(boards) -> tuple[int, int]:
+    """
+    (list) -> tuple
+
+    Returns the green and the white bitboards of all boards packed into
+    two ints, the i-th board in the i-th 64-bit lane (as encode_board).
+
+    Every row is looked up as a whole in ROW_CELLS, the rows of all boards
+    are joined into one byte string of cells, and the string is turned
+    into the two bitboards with bytes.translate and int(..., 2), so
+    there's no Python loop over single cells.
+
+    >>> encode_boards([[['g', 'w', 0, 0]] + [[0, 0, 0, 0]] * 15] * 2) == \
+(1 + (1 << 64), 2 + (2 << 64))
+    True
+    >>> encode_boards([[['g', 'w', 0, 0, 0], [0, 0, 0]] + [[0, 0, 0, 0]] * 14])
+    Traceback (most recent call last):
+    ...
+    ValueError: boards must be 16 x 4
+    """
+    if any(len(board) != ROWS for board in boards):
+        raise ValueError(f"boards must be {ROWS} x {COLUMNS}")
+    cells = b''.join([ROW_CELLS[tuple(row)] for board in boards for row in board])
+    # the first cell of the string is the highest bit
+    cells = cells[::-1]
+    return int(cells.translate(GREEN_BITS), 2), int(cells.translate(WHITE_BITS), 2)
+
+
+def _unpack(packed: int, count: int) -> array:
+    """
+    (int, int) -> array
+
+    Splits an int of count 64-bit lanes into the bitboards of the lanes.
+    """
+    lanes = array('Q')
+    lanes.frombytes(packed.to_bytes(count * 8, 'little'))
+    return lanes
+
+
+def winning_boards(boards) -> tuple[list[bool], list[list]]:
+    """
+    (list) -> tuple
+
+    Checks a batch of boards (a N x 16 x 4 list or another sequence of
+    boards) for winning combinations. Returns a list of flags, True for
+    the boards with a winning combination, and a list of the winning
+    positions of every board as in winning_combination (empty if none).
+
+    The bitboards of all boards are packed into one int, 64 bits per
+    board, and every kind of line is found for all boards at once: a
+    rotation moves every lane by the same shift and a mask keeps the bits
+    in their own lane. The memory grows linearly with the number of boards.
+
+    >>> board = [[0, 0, 0, 'w']] * 4 + [[0, 0, 0, 0]] * 12
+    >>> winning_boards([board, [[0, 0, 0, 0]] * 16])
+    ([True, False], [[[(3, 0), (3, 1), (3, 2), (3, 3)]], []])
+    """
+    count = len(boards)
+    if count == 0:
+        return [], []
+    green, white = encode_boards(boards)
+    size = ROWS * COLUMNS
+    starts = []
+    for step, first in LINES:
+        low = _lane_mask(FULL >> step, count)
+        high = _lane_mask(FULL ^ FULL >> step, count)
+        low2 = _lane_mask(FULL >> 2 * step, count)
+        high2 = _lane_mask(FULL ^ FULL >> 2 * step, count)
+        found = 0
+        for bits in (green, white):
+            pairs = bits & (bits >> step & low | bits << size - step & high)
+            found |= pairs & (pairs >> 2 * step & low2 | pairs << size - 2 * step & high2)
+        starts.append(found & _lane_mask(first, count))
+    won = _unpack(starts[0] | starts[1] | starts[2] | starts[3], count)
+    flags = [el != 0 for el in won]
+    positions = [[] for _ in range(count)]
+    lanes = [_unpack(el, count) for el in starts]
+    for i in compress(range(count), flags):
+        positions[i] = _positions([el[i] for el in lanes])
+    return flags, positions
+
+
+def benchmark_winning_combination(count: int = 100000) -> dict[str, float]:
+    """
+    (int) -> dict
+
+    Checks count generated boards for winning lines and returns the
+    evaluations per second of the bitboard check alone and together
+    with encoding the boards from lists.
+    """
+    boards = [board_generation() for _ in range(count)]
+    start = time.perf_counter()
+    encoded = [encode_board(board) for board in boards]
+    encode_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for green, white in encoded:
+        winning_starts(green)
+        winning_starts(white)
+    check_time = time.perf_counter() - start
+    return {'bitboards': count / check_time,
+            'with_encoding': count / (check_time + encode_time)}
+
+
+def benchmark_winning_boards(count: int = 100000) -> dict[str, float]:
+    """
+    (int) -> dict
+
+    Checks a batch of count generated boards with winning_combination
+    board by board and with winning_boards, and returns the boards per
+    second of both.
     """
-    pass
+    boards = board_generation_batch(count)
+    start = time.perf_counter()
+    single = [winning_combination(board) for board in boards]
+    single_time = time.perf_counter() - start
+    start = time.perf_counter()
+    flags, positions = winning_boards(boards)
+    batch_time = time.perf_counter() - start
+    assert flags == [el is not False for el in single]
+    return {'winning_combination': count / single_time,
+            'winning_boards': count / batch_time}
@@ -1,5 +1,14 @@
 """looking for pirate's treasure"""
 import math
+import multiprocessing
+import os
+import random
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from functools import partial
+from itertools import accumulate, repeat
+from operator import floordiv, mod
 def define_direction(previous_direction, azimuth):
     """
     Calculate the new path direction based on the current direction
@@ -41,6 +50,52 @@ def define_direction(previous_direction, azimuth):
     new_index = int(math.fmod(new_index, 4))
     return directions[new_index]
 
+
+CHUNK_SIZE = 1 << 20
+BLANK_ROWS = 1 << 16
+DIRECTIONS = 'NESW'
+
+
+def read_map_arrays(file_name, chunk_size=CHUNK_SIZE):
+    """
+    Reads a map as read_map does, but returns the instructions as two
+    integer arrays instead of a list of tuples.
+
+    The file is read in chunks of chunk_size bytes and split into
+    numbers, so every non-empty line must hold two numbers. The turns of
+    all lines are summed at once: the direction after a line is the
+    number of quarter turns made so far modulo 4, an index into
+    DIRECTIONS ('NESW'), and the first direction is North.
+
+    Args:
+    file_name (str): The pathname of the file containing the map data.
+    chunk_size (int): The number of bytes read at a time.
+
+    Returns:
+    tuple: A tuple (start, directions, steps), where start is the
+    starting coordinate (x, y), directions is an array('B') of the
+    direction indexes and steps is an array('q') of the steps.
+
+    >>> start, directions, steps = read_map_arrays("treasure_3.txt", 8)
+    >>> start, ''.join(DIRECTIONS[el] for el in directions), steps.tolist()
+    ((0, 11), 'WWSEENESEN', [5, 6, 7, 3, 4, 5, 2, 2, 2, 4])
+    """
+    numbers = array('q')
+    rest = b''
+    with open(file_name, "rb") as file:
+        while chunk := file.read(chunk_size):
+            tokens = (rest + chunk).split()
+            rest = tokens.pop() if tokens and not chunk[-1:].isspace() else b''
+            numbers.extend(map(int, tokens))
+    if rest:
+        numbers.append(int(rest))
+    if len(numbers) < 2 or len(numbers) % 2:
+        raise ValueError(f"{file_name} is not a map: expected pairs of numbers")
+    turns = accumulate(map(floordiv, numbers[2::2], repeat(90)))
+    directions = array('B', map(mod, turns, repeat(4)))
+    return ((numbers[0], numbers[1]), directions, numbers[3::2])
+
+
 def read_map(file_name):
     """
     Reads a map from the specified file and interprets the directions
@@ -54,6 +109,8 @@ def read_map(file_name):
 
     Note: The file may contain empty lines, which should be ignored.
 
+    The file is parsed by read_map_arrays.
+
     Args:
     file_name (str): The pathname of the file containing the map data.
 
@@ -70,6 +127,18 @@ def read_map(file_name):
     ((0, 11), \
 [('W', 5), ('W', 6), ('S', 7), ('E', 3), ('E', 4), \
 ('N', 5), ('E', 2), ('S', 2), ('E', 2), ('N', 4)])
+    """
+    start, directions, steps = read_map_arrays(file_name)
+    return (start, list(zip(map(DIRECTIONS.__getitem__, directions), steps)))
+
+
+def _read_map_by_line(file_name):
+    """
+    Reads a map line by line with define_direction, as read_map did
+    before read_map_arrays. Kept as the reference for benchmark_read_map.
+
+    >>> _read_map_by_line("treasure_3.txt") == read_map("treasure_3.txt")
+    True
     """
     with open(file_name, "r", encoding="utf-8") as file:
         content = file.read()
@@ -143,6 +212,108 @@ def find_path(start, treasure_directions):
     return the_map
 
 
+STEPS = {'N': (-1, 0), 'S': (1, 0), 'E': (0, 1), 'W': (0, -1)}
+
+
+def find_segments(start, treasure_directions):
+    """
+    Calculates the path based on the given start position and a series
+    of directional steps as in find_path, but keeps every instruction as
+    one segment instead of one coordinate per step. A segment is a tuple
+    (start, direction, length), where start is the coordinate (x, y) the
+    segment begins at, so the path takes memory proportional to the number
+    of instructions and not to the number of steps.
+
+    A path without instructions is a single segment of length 0.
+
+    Args:
+    start (tuple): A tuple representing the starting coordinates (x, y).
+    treasure_directions (list of tuple): A list of tuples (direction, steps)
+                                         as returned by read_map.
+
+    Returns:
+    list of tuple: A list of segments (start, direction, length).
+
+    >>> find_segments((0, 0), [('E', 3), ('S', 3), ('W', 3), ('N', 3)])
+    [((0, 0), 'E', 3), ((0, 3), 'S', 3), ((3, 3), 'W', 3), ((3, 0), 'N', 3)]
+    >>> find_segments((2, 4), [])
+    [((2, 4), 'N', 0)]
+    """
+    x, y = start
+    segments = []
+    for direction, length in treasure_directions:
+        segments.append(((x, y), direction, length))
+        step_x, step_y = STEPS[direction]
+        x, y = x + step_x * length, y + step_y * length
+    if not segments:
+        segments.append(((x, y), 'N', 0))
+    return segments
+
+
+def read_segments(file_name):
+    """
+    Reads a map from the specified file and returns its path as a list
+    of segments (see find_segments).
+
+    >>> read_segments("treasure_1.txt")
+    [((0, 0), 'E', 2), ((0, 2), 'S', 2), ((2, 2), 'W', 2), ((2, 0), 'N', 2)]
+    """
+    start, treasure_directions = read_map(file_name)
+    return find_segments(start, treasure_directions)
+
+
+def segment_end(segment):
+    """
+    Returns the coordinate (x, y) the segment ends at.
+
+    >>> segment_end(((0, 3), 'S', 3))
+    (3, 3)
+    """
+    (x, y), direction, length = segment
+    step_x, step_y = STEPS[direction]
+    return (x + step_x * length, y + step_y * length)
+
+
+def find_segments_size(segments):
+    """
+    Calculates the size of the map as find_size does for the expanded
+    path, but from the segment endpoints only: a path can't reach further
+    than the ends of its segments.
+
+    >>> find_segments_size(find_segments((2, 4), [('W', 2), ('S', 2), ('E', 2), ('N', 2)]))
+    (3, 3)
+    """
+    points = [segments[0][0]] + [segment_end(segment) for segment in segments]
+    horizontal = [el[0] for el in points]
+    vertical = [el[1] for el in points]
+    width = max(horizontal) - min(horizontal) + 1
+    heigth = max(vertical) - min(vertical) + 1
+    return((width,heigth))
+
+
+def shift_segments(segments):
+    """
+    Shifts the segments as shift_path shifts the expanded path. The
+    smallest coordinate of a segment is always one of its ends, so only
+    the endpoints are looked at.
+
+    Returns:
+    tuple: A tuple where:
+        - The first element is the smallest coordinate (x, y) of the path.
+        - The second element is the list of shifted segments.
+
+    >>> shift_segments(find_segments((2, 4), [('W', 2), ('S', 2), ('E', 2), ('N', 2)]))
+    ((2, 2), [((0, 2), 'W', 2), ((0, 0), 'S', 2), ((2, 0), 'E', 2), ((2, 2), 'N', 2)])
+    """
+    points = [segments[0][0]] + [segment_end(segment) for segment in segments]
+    init_min = min(points)
+    coeff_x = min(el[0] for el in points)
+    coeff_y = min(el[1] for el in points)
+    new_segments = [((x - coeff_x, y - coeff_y), direction, length)
+                    for (x, y), direction, length in segments]
+    return (init_min, new_segments)
+
+
 def find_treasure(path1, path2):
     """
     Determines the location of the treasure based on the intersection of
@@ -193,6 +364,163 @@ def find_treasure(path1, path2):
     return None
 
 
+def _merge_lines(segments):
+    """
+    Splits the segments into the cells they cover: horizontal lines are
+    returned as a dict row -> sorted disjoint column intervals (lo, hi)
+    and vertical lines as a dict column -> sorted disjoint row intervals.
+    Segments of length 0 are kept as horizontal lines of one cell.
+
+    >>> _merge_lines(find_segments((0, 0), [('E', 2), ('S', 2), ('W', 3), ('E', 5)]))
+    ({0: [(0, 2)], 2: [(-1, 4)]}, {2: [(0, 2)]})
+    """
+    rows, columns = {}, {}
+    for segment in segments:
+        (x1, y1), (x2, y2) = segment[0], segment_end(segment)
+        if segment[1] in 'EW' or segment[2] == 0:
+            rows.setdefault(x1, []).append((min(y1, y2), max(y1, y2)))
+        else:
+            columns.setdefault(y1, []).append((min(x1, x2), max(x1, x2)))
+    for lines in (rows, columns):
+        for key, intervals in lines.items():
+            intervals.sort()
+            merged = [intervals[0]]
+            for lo, hi in intervals[1:]:
+                if lo <= merged[-1][1] + 1:
+                    merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+                else:
+                    merged.append((lo, hi))
+            lines[key] = merged
+    return rows, columns
+
+
+def _covers(intervals, lo, hi):
+    """
+    Yields the values from lo to hi covered by the sorted disjoint
+    intervals.
+
+    >>> list(_covers([(0, 2), (5, 9)], 1, 6))
+    [1, 2, 5, 6]
+    """
+    index = max(bisect_right(intervals, (lo, lo)) - 1, 0)
+    while index < len(intervals) and intervals[index][0] <= hi:
+        start, end = intervals[index]
+        yield from range(max(lo, start), min(hi, end) + 1)
+        index += 1
+
+
+def _crossings(queries, walls):
+    """
+    Sweeps a line over the rows and yields (row, column, index) for every
+    cell where a horizontal query (row, lo, hi, index) crosses a vertical
+    wall (column, lo, hi). Walls in the same column must not overlap. The
+    columns of the walls crossing the sweep line are kept in a sorted list,
+    so each query is answered by a binary search.
+
+    >>> list(_crossings([(1, 0, 5, 0), (4, 0, 5, 1)], [(2, 0, 3), (4, 1, 1)]))
+    [(1, 2, 0), (1, 4, 0)]
+    """
+    events = [(lo, 0, column, 0, 0) for column, lo, hi in walls]
+    events += [(row, 1, lo, hi, index) for row, lo, hi, index in queries]
+    events += [(hi, 2, column, 0, 0) for column, lo, hi in walls]
+    events.sort()
+    active = []
+    for row, kind, lo, hi, index in events:
+        if kind == 0:
+            insort(active, lo)
+        elif kind == 2:
+            del active[bisect_left(active, lo)]
+        else:
+            for position in range(bisect_left(active, lo), bisect_right(active, hi)):
+                yield (row, active[position], index)
+
+
+def _intersections(segments1, segments2):
+    """
+    Yields (index, point) for the points of the first path which lie on
+    the second path, where index is the segment of the first path the
+    point belongs to (-1 for the start). Every segment owns its cells
+    except its start, so a point is yielded as many times as find_treasure
+    would count it, possibly more than once for the same segment.
+    """
+    rows, columns = _merge_lines(segments2)
+    start = segments1[0][0]
+    if list(_covers(rows.get(start[0], []), start[1], start[1])) or \
+            list(_covers(columns.get(start[1], []), start[0], start[0])):
+        yield (-1, start)
+    horizontal, vertical = [], []
+    for index, segment in enumerate(segments1):
+        (x, y), direction, length = segment
+        if length == 0:
+            continue
+        step_x, step_y = STEPS[direction]
+        if direction in 'EW':
+            lo, hi = sorted((y + step_y, y + step_y * length))
+            horizontal.append((x, lo, hi, index))
+        else:
+            lo, hi = sorted((x + step_x, x + step_x * length))
+            vertical.append((y, lo, hi, index))
+    for x, lo, hi, index in horizontal:
+        for y in _covers(rows.get(x, []), lo, hi):
+            yield (index, (x, y))
+    for y, lo, hi, index in vertical:
+        for x in _covers(columns.get(y, []), lo, hi):
+            yield (index, (x, y))
+    walls = [(y, lo, hi) for y, intervals in columns.items() for lo, hi in intervals]
+    for x, y, index in _crossings(horizontal, walls):
+        yield (index, (x, y))
+    walls = [(x, lo, hi) for x, intervals in rows.items() for lo, hi in intervals]
+    for y, x, index in _crossings(vertical, walls):
+        yield (index, (x, y))
+
+
+def find_treasure_segments(segments1, segments2):
+    """
+    Determines the location of the treasure as find_treasure does, but
+    from the segments of both paths: the horizontal and vertical lines of
+    the paths are crossed with a sweep line and the overlapping ones are
+    compared by interval, so the work depends on the number of
+    instructions and not on the length of the paths. The search stops as
+    soon as a third intersection is found.
+
+    Args:
+    segments1 (list of tuple): The segments of the first path.
+    segments2 (list of tuple): The segments of the second path.
+
+    Returns:
+    tuple or None: The coordinates (x, y) of the treasure if it
+    can be determined, or `None`  if the treasure's location
+    cannot be identified.
+
+    >>> segments1 = find_segments((0, 0), [('E', 2), ('S', 2), ('W', 2), ('N', 2)])
+    >>> segments2 = find_segments((2, 4), [('W', 2), ('S', 2), ('E', 2), ('N', 2)])
+    >>> segments3 = find_segments((1, 4), [('W', 2), ('S', 2), ('E', 2), ('N', 2)])
+    >>> find_treasure_segments(segments1, segments2)
+    (2, 2)
+    >>> find_treasure_segments(segments1, segments3)
+    (1, 2)
+    >>> find_treasure_segments(segments2, segments3)
+    """
+    found = {}
+    intersections = []
+    for index, point in _intersections(segments1, segments2):
+        points = found.setdefault(index, set())
+        if point in points:
+            continue
+        points.add(point)
+        intersections.append(point)
+        if len(intersections) > 2:
+            return None
+    if len(intersections) == 1:
+        return intersections[0]
+    if len(intersections) == 2:
+        el1, el2 = intersections[0], intersections[1]
+        x = (el1[0] + el2[0])//2
+        y = (el1[1] + el2[1])//2
+        return (x,y)
+    return None
+
+
 def find_size(path):
     """
     Calculates the size of the map based on the given path. The size of the map
@@ -260,7 +588,175 @@ def shift_path(path):
     return (init_min, new_path)
 
 
-def decode_map(file_name1, file_name2, map_file_name):
+def _on_segment(point, segment):
+    """
+    Checks whether the point (x, y) lies on the segment.
+
+    >>> _on_segment((2, 3), ((0, 3), 'S', 3))
+    True
+    >>> _on_segment((2, 3), ((0, 3), 'N', 3))
+    False
+    """
+    (x1, y1), (x2, y2) = segment[0], segment_end(segment)
+    return min(x1, x2) <= point[0] <= max(x1, x2) and \
+        min(y1, y2) <= point[1] <= max(y1, y2)
+
+
+def _clip_segments(segments, viewport):
+    """
+    Clips the segments to the viewport (top, left, bottom, right) and
+    splits them into horizontal lines, a dict row -> [(lo, hi)] of
+    column intervals, and vertical lines, a list of (lo, hi, column) row
+    intervals. The segments outside the viewport are dropped.
+
+    >>> _clip_segments([((0, 0), 'E', 5), ((0, 5), 'S', 5), ((5, 5), 'W', 2)], (0, 0, 3, 4))
+    ({0: [(0, 3)]}, [])
+    >>> _clip_segments([((0, 1), 'S', 5)], (0, 0, 3, 4))
+    ({}, [(0, 2, 1)])
+    """
+    top, left, bottom, right = viewport
+    rows, columns = {}, []
+    for segment in segments:
+        (x1, y1), (x2, y2) = segment[0], segment_end(segment)
+        if x1 == x2:
+            lo, hi = max(min(y1, y2), left), min(max(y1, y2), right - 1)
+            if top <= x1 < bottom and lo <= hi:
+                rows.setdefault(x1, []).append((lo, hi))
+        else:
+            lo, hi = max(min(x1, x2), top), min(max(x1, x2), bottom - 1)
+            if left <= y1 < right and lo <= hi:
+                columns.append((lo, hi, y1))
+    return rows, columns
+
+
+def _write_blank_rows(file, count):
+    """
+    Writes count line breaks to the file, at most BLANK_ROWS at a time,
+    so a long gap between two rows doesn't need a string as long as it.
+    """
+    while count > 0:
+        file.write('\n' * min(count, BLANK_ROWS))
+        count -= BLANK_ROWS
+
+
+def render_map(map_file_name, size, paths, treasure=None, viewport=None):
+    """
+    Draws the paths and the treasure on a map of the given size
+    (rows, columns) and writes it to map_file_name.
+
+    The paths are given as a list of tuples (segments, start, mark): the
+    cells of the segments are marked with '.' and the cell start, if the
+    path goes through it, with mark. A later path is drawn over the earlier
+    ones and the treasure, if any, is marked with 'x' over everything.
+
+    The map is never built: the horizontal lines are kept by row, the
+    vertical lines are swept from top to bottom, and every row is drawn
+    and written to the file on its own, so the memory depends on the
+    number of segments and the width of a row, not on the size of the
+    map. The viewport (row, column, height, width) draws only that part
+    of the map; the cells outside the map are never drawn. The trailing
+    spaces of each row are stripped.
+
+    >>> import os, tempfile
+    >>> map_file = os.path.join(tempfile.mkdtemp(), 'map.txt')
+    >>> paths = [(find_segments((0, 0), [('E', 2), ('S', 1)]), (0, 0), '1')]
+    >>> render_map(map_file, (3, 4), paths, (1, 2))
+    >>> with open(map_file, 'r', encoding='utf-8') as file:
+    ...    print(file.read().replace('\\n', '|'))
+    1..|  x|
+    """
+    rows, columns = size
+    top, left, height, width = viewport or (0, 0, rows, columns)
+    bottom, right = min(top + height, rows), min(left + width, columns)
+    top, left = max(top, 0), max(left, 0)
+    bounds = (top, left, bottom, right)
+    horizontal, vertical = {}, []
+    marks = {}
+    for segments, start, mark in paths:
+        path_rows, path_columns = _clip_segments(segments, bounds)
+        for x, intervals in path_rows.items():
+            horizontal.setdefault(x, []).extend(intervals)
+        vertical.extend(path_columns)
+        for point in list(marks):
+            if any(_on_segment(point, segment) for segment in segments):
+                del marks[point]
+        if top <= start[0] < bottom and left <= start[1] < right and \
+                any(_on_segment(start, segment) for segment in segments):
+            marks[start] = mark
+    if treasure is not None and top <= treasure[0] < bottom and left <= treasure[1] < right:
+        marks[tuple(treasure)] = 'x'
+    marked_rows = {}
+    for (x, y), mark in marks.items():
+        marked_rows.setdefault(x, []).append((y, mark))
+    vertical.sort()
+    ends = sorted((hi, column) for lo, hi, column in vertical)
+    rows_left = sorted(set(horizontal) | set(marked_rows))
+    active = {}
+    opened = closed = next_row = 0
+    position = x = top
+    with open(map_file_name, "w", encoding="utf-8") as file:
+        while True:
+            if not active:
+                candidates = []
+                if opened < len(vertical):
+                    candidates.append(vertical[opened][0])
+                if next_row < len(rows_left):
+                    candidates.append(rows_left[next_row])
+                if not candidates:
+                    break
+                x = max(x, min(candidates))
+            while opened < len(vertical) and vertical[opened][0] <= x:
+                column = vertical[opened][2]
+                active[column] = active.get(column, 0) + 1
+                opened += 1
+            while next_row < len(rows_left) and rows_left[next_row] <= x:
+                next_row += 1
+            intervals = horizontal.get(x, [])
+            cells = marked_rows.get(x, [])
+            last = max([hi for lo, hi in intervals] + [y for y, mark in cells] + list(active))
+            line = [' '] * (last - left + 1)
+            for lo, hi in intervals:
+                line[lo - left:hi - left + 1] = '.' * (hi - lo + 1)
+            for column in active:
+                line[column - left] = '.'
+            for y, mark in cells:
+                line[y - left] = mark
+            _write_blank_rows(file, x - position)
+            file.write(''.join(line))
+            position = x
+            while closed < len(ends) and ends[closed][0] == x:
+                column = ends[closed][1]
+                active[column] -= 1
+                if not active[column]:
+                    del active[column]
+                closed += 1
+            x += 1
+        if bottom > top:
+            _write_blank_rows(file, bottom - 1 - position)
+
+
+def _layout_map(segments1, segments2):
+    """
+    Lays out the map of two paths for render_map: the first path is
+    shifted so that its smallest coordinate is (0, 0) and the second one
+    is kept as it is. Returns the treasure, the size (rows, columns) of
+    the map and the paths with their start marks.
+
+    >>> treasure, size, paths = _layout_map(read_segments('treasure_1.txt'), \
+read_segments('treasure_2.txt'))
+    >>> treasure, size, [el[1:] for el in paths]
+    ((2, 2), (5, 6), [((0, 0), '1'), ((2, 4), '2')])
+    """
+    size1 = find_segments_size(segments1)
+    size2 = find_segments_size(segments2)
+    shifted = shift_segments(segments1)[1]
+    treasure = find_treasure_segments(shifted, segments2)
+    size = (size1[1] + size2[1] - 1, size1[0] + size2[0])
+    paths = [(shifted, (0, 0), '1'), (segments2, segments2[0][0], '2')]
+    return treasure, size, paths
+
+
+def decode_map(file_name1, file_name2, map_file_name, viewport=None):
     """
     Draws a map that visualizes two paths and the treasure (if it exists)
     based on the paths provided in two input files. The map is written
@@ -279,6 +775,8 @@ def decode_map(file_name1, file_name2, map_file_name):
     file_name1 (str): The name of the file containing the first path.
     file_name2 (str): The name of the file containing the second path.
     map_file_name (str): The name of the output file where the map will be drawn.
+    viewport (tuple): Optional (row, column, height, width) part of the map
+                      to draw, see render_map. By default the whole map.
 
     Returns:
     None: The map is written directly to the output file.
@@ -291,42 +789,162 @@ def decode_map(file_name1, file_name2, map_file_name):
     ..x.2
       . .
       ...
+    >>> import os, tempfile
+    >>> map_file = os.path.join(tempfile.mkdtemp(), 'map.txt')
+    >>> decode_map('treasure_1.txt', 'treasure_2.txt', map_file, (2, 1, 2, 3))
+    >>> with open(map_file, 'r', encoding='utf-8') as file:
+    ...    print(file.read())
+    .x.
+     .
     """
-    map1 = read_map(file_name1)
-    map2 = read_map(file_name2)
-    path1 = find_path(map1[0], map1[1])
-    size1 = find_size(path1)
-    path1 = shift_path(path1)[1]
-    path2 = find_path(map2[0],map2[1])
-    size2 = find_size(path2)
-    result, new_line = '', '\n'
-    final_map = [[ " " for _ in range(size1[0]+size2[0])] for _ in range(size1[1]+size2[1]-1)]
-    for el in path1:
-        x, y = el[0], el[1]
-        if x == 0 and y == 0:
-            final_map[x][y] = "1"
-        else:
-            final_map[x][y] = "."
-    start_path2 = list(map2[0])
-    for el in path2:
-        x, y = el[0], el[1]
-        if x == start_path2[0] and y == start_path2[1]:
-            final_map[x][y] = "2"
-        else:
-            final_map[x][y] = "."
-    intersection = list(find_treasure(path1, path2))
-    x,y = intersection
-    final_map[x][y] = "x"
-    for i, row in enumerate(final_map):
-        row = [str(el) for el in row]
-        line = ''.join(row)
-        line = line.rstrip()
-        if i == len(final_map) - 1:
-            new_line = ''
-        result += line + new_line
-    with open(map_file_name, "w", encoding="utf-8") as file:
-        file.write(result)
+    segments1 = read_segments(file_name1)
+    segments2 = read_segments(file_name2)
+    treasure, size, paths = _layout_map(segments1, segments2)
+    render_map(map_file_name, size, paths, treasure, viewport)
+
+
+
+def read_manifest(file_name):
+    """
+    Reads a manifest of map pairs. Every line of the file holds the
+    names of the two map files and of the output map file separated by
+    spaces; the output may be left out when only the treasure is needed.
+    Empty lines are ignored.
+
+    Args:
+    file_name (str): The pathname of the manifest file.
 
+    Returns:
+    list of tuple: A list of tuples (map1, map2, output), where output
+    is None if it is not given.
+    """
+    with open(file_name, "r", encoding="utf-8") as file:
+        lines = [el.split() for el in file.read().splitlines() if el.strip()]
+    return [(el[0], el[1], el[2] if len(el) > 2 else None) for el in lines]
+
+
+def _solve_maps(render, pair):
+    """
+    Finds the treasure of one map pair and draws the map if render is
+    True and the pair has an output file. Returns the pair, the treasure,
+    the seconds spent on reading, solving and rendering, and the error.
+
+    An error doesn't stop the batch: it is returned as a string with the
+    seconds of the steps done before it (None for the others).
+
+    >>> pair, treasure, seconds, error = _solve_maps(False, \
+('treasure_1.txt', 'missing.txt', None))
+    >>> treasure, seconds[1:], error.split(':')[0]
+    (None, (None, None), 'FileNotFoundError')
+    """
+    file_name1, file_name2, map_file_name = pair
+    treasure, error = None, None
+    seconds = [None, None, None]
+    start = time.perf_counter()
+    try:
+        segments1 = read_segments(file_name1)
+        segments2 = read_segments(file_name2)
+        seconds[0] = time.perf_counter() - start
+        start = time.perf_counter()
+        treasure, size, paths = _layout_map(segments1, segments2)
+        seconds[1] = time.perf_counter() - start
+        start = time.perf_counter()
+        if render and map_file_name is not None:
+            render_map(map_file_name, size, paths, treasure)
+        seconds[2] = time.perf_counter() - start
+    except Exception as exc:
+        step = seconds.index(None)
+        seconds[step] = time.perf_counter() - start
+        error = f'{type(exc).__name__}: {exc}'
+    return (pair, treasure, tuple(seconds), error)
+
+
+def solve_treasure_maps(manifest, results_file_name='results.txt', render=True,
+                        processes=None, chunksize=1):
+    """
+    Finds the treasures of many map pairs as decode_map does, spread over
+    a pool of processes, and writes a results file.
+
+    Every line of the results file holds, separated by tabs, the two map
+    files, the output file, the treasure coordinates (or None), the
+    seconds spent on reading, solving and rendering the pair and the
+    error (or None); the first line is a header. A pair that fails, e.g.
+    with a missing map file, gets its error and the seconds spent before
+    it, and the other pairs are still solved. With render=False no maps are drawn and only the
+    treasures are found. With processes=1 the pairs are solved in the
+    current process.
+
+    Args:
+    manifest (str or list of tuple): The name of a manifest file (see
+                                     read_manifest) or a list of tuples
+                                     (map1, map2, output).
+    results_file_name (str): The name of the results file.
+    render (bool): Whether to draw the maps of the pairs with an output.
+    processes (int): The number of worker processes, by default one
+                     per CPU.
+
+    Returns:
+    list of tuple: A list of tuples (pair, treasure, seconds, error) in
+    the order of the manifest.
+
+    >>> import os, tempfile
+    >>> results_file = os.path.join(tempfile.mkdtemp(), 'results.txt')
+    >>> results = solve_treasure_maps([('treasure_1.txt', 'treasure_2.txt', None), \
+('treasure_1.txt', 'missing.txt', None), ('treasure_1.txt', 'treasure_3.txt', None)], \
+results_file, processes=1)
+    >>> [el[1] for el in results]
+    [(2, 2), None, None]
+    >>> with open(results_file, 'r', encoding='utf-8') as file:
+    ...    lines = [el.split('\\t') for el in file.read().splitlines()]
+    >>> lines[0]
+    ['map1', 'map2', 'output', 'treasure', 'read', 'solve', 'render', 'error']
+    >>> [el[-1].split(':')[0] for el in lines[1:]]
+    ['None', 'FileNotFoundError', 'None']
+    """
+    if isinstance(manifest, str):
+        manifest = read_manifest(manifest)
+    solve = partial(_solve_maps, render)
+    if processes == 1:
+        results = [solve(pair) for pair in manifest]
+    else:
+        if 'fork' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('fork')
+        else:
+            context = multiprocessing.get_context()
+        with context.Pool(processes) as pool:
+            results = pool.map(solve, manifest, chunksize)
+    with open(results_file_name, "w", encoding="utf-8") as file:
+        file.write('map1\tmap2\toutput\ttreasure\tread\tsolve\trender\terror\n')
+        for pair, treasure, seconds, error in results:
+            place = 'None' if treasure is None else f'{treasure[0]} {treasure[1]}'
+            fields = [*pair[:2], str(pair[2]), place]
+            fields += ['None' if el is None else f'{el:.6f}' for el in seconds]
+            fields.append(' '.join(str(error).split()))
+            file.write('\t'.join(fields) + '\n')
+    return results
+
+
+def benchmark_read_map(count=2000000, file_name='benchmark_map.txt'):
+    """
+    Writes a random map of count instructions to file_name, reads it with
+    _read_map_by_line and with read_map, checks that both agree, removes
+    the file and returns the seconds both took.
+    """
+    lines = [f'{random.randrange(0, 360, 90)} {random.randint(1, 10**6)}'
+             for _ in range(count)]
+    with open(file_name, "w", encoding="utf-8") as file:
+        file.write('0 0\n' + '\n'.join(lines) + '\n')
+    try:
+        start = time.perf_counter()
+        by_line = _read_map_by_line(file_name)
+        by_line_time = time.perf_counter() - start
+        start = time.perf_counter()
+        chunked = read_map(file_name)
+        chunked_time = time.perf_counter() - start
+    finally:
+        os.remove(file_name)
+    assert by_line == chunked
+    return {'_read_map_by_line': by_line_time, 'read_map': chunked_time}
 
 
 if __name__ == '__main__':
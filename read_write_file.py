@@ -1,4 +1,244 @@
+import csv
+import hashlib
+import http.client
+import io
+import os
+import re
+import threading
+import time
+import urllib.error
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
+from urllib.parse import urljoin, urlsplit
+
+CHUNK_SIZE = 2 ** 20
+MAX_RECORD_SIZE = 2 ** 20
+SEPARATOR = re.compile(r"^–[^\n]*(?:\n|\Z)", re.M)
+# a whole record in the usual layout, up to and with its separator line:
+# number, name, status and score on the first line, the average score as
+# the last field of the fourth line. The lines start and end with no
+# spaces, so the fields are the same as _parse_record finds.
+RECORD = re.compile(r"(?!–)(\S[^\t\n]*)\t([^\t\n]*)\t([^\t\n]*)\t([^\t\n]*)\t[^\n]*\S\n"
+                    r"(?!–)[^\n]*\n(?!–)[^\n]*\n"
+                    r"(?!–)(?:\S[^\n]*\t|(?=\S))([^\t\n]*\S)\n"
+                    r"(?:(?!–)[^\n]*\n)*–[^\n]*(?:\n|\Z)")
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+
+def open_source(source):
+    """
+    Opens the source of a ranking document for reading bytes: a file-like
+    object is used as it is, a string starting with http:// or https://
+    is fetched, any other string is a local file name.
+    """
+    if hasattr(source, "read"):
+        return _Borrowed(source)
+    if source.startswith(("http://", "https://")):
+        return urllib.request.urlopen(source)
+    return open(source, "rb")
+
+
+class _Borrowed:
+    """Context manager that gives a file-like object but doesn't close it."""
+
+    def __init__(self, file):
+        self.file = file
+
+    def __enter__(self):
+        return self.file
+
+    def __exit__(self, *args):
+        return False
+
+
+def _parse_record(record: str) -> list[str] | None:
+    """
+    Parses the text of one student record: the number, the name, the
+    status ("+" for "До наказу", "-" otherwise) and the score from the
+    first line and the last field of the fourth line. Returns None if
+    the record is cut short.
+
+    >>> _parse_record("7\\tІваненко І. І.\\tДо наказу\\t190.5\\t1\\na\\nb\\nc\\t9.9\\n")
+    ['7', 'Іваненко І. І.', '+', '190.5', '9.9']
+    >>> _parse_record("7\\tІваненко І. І.\\tДо наказу\\n")
+    """
+    lines = record.split("\n", 4)
+    info = lines[0].strip().split("\t")[:4]
+    if len(lines) < 5 or len(info) < 3:
+        return None
+    info[2] = "+" if info[2] == "До наказу" else "-"
+    info.append(lines[3].strip().split("\t")[-1])
+    return info
+
+
+def iter_students(source, stats: dict | None = None, chunk_size: int = CHUNK_SIZE,
+                  max_record_size: int = MAX_RECORD_SIZE):
+    """
+    Yields the students of a ranking document one by one.
+    source is a url, a file name or a file-like object (see open_source).
+
+    The document is read in chunks of chunk_size bytes. Every chunk is
+    cut at its last line break and decoded at once. The records in the
+    usual layout are matched with their fields by one regular expression
+    (RECORD), the rest are split on the separator lines (the ones
+    starting with "–") and parsed by _parse_record. A record cut short at
+    the end of the document is skipped, and so is a record longer than
+    max_record_size bytes: the text up to the next separator line is
+    dropped. So memory stays bounded by the chunk size and the record size.
+
+    If stats is a dict, it gets the number of records, the number of
+    skipped records, the bytes read, the time in seconds, and the
+    records and bytes per second once the document is read.
+
+    >>> next(iter_students('ranking_example.txt'))
+    ['1', 'Мацюк М. І.', '+', '197.859', '10.80']
+    >>> [el[2] for el in iter_students('ranking_example.txt')]
+    ['+', '+', '+', '-']
+    >>> with open('ranking_example.txt', 'rb') as file:
+    ...     content = file.read()
+    >>> stats = {}
+    >>> len(list(iter_students(io.BytesIO(content[:-100]), stats, 64)))
+    3
+    >>> stats['records'], stats['skipped']
+    (3, 1)
+    >>> [len(list(iter_students('ranking_example.txt', None, size))) for size in (1, 7, 64)]
+    [4, 4, 4]
+    >>> hyphens = content.decode('utf-8').replace('–', '-').encode('utf-8')
+    >>> list(iter_students(io.BytesIO(hyphens), stats, 64, 256)), stats['skipped']
+    ([], 1)
+    >>> list(iter_students(io.BytesIO(hyphens.replace(b'\\n', b' ')), stats, 64, 256))
+    []
+    """
+    start = time.perf_counter()
+    records = skipped = size = 0
+    header_lines = 2 #skipping first two lines
+    pending, tail = "", b""
+    # skipping: dropping a long record up to the next separator,
+    # skip_line: dropping the rest of a line cut off with it
+    skipping = skip_line = False
+    with open_source(source) as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            size += len(chunk)
+            data = tail + chunk
+            if skip_line:
+                newline = data.find(b"\n")
+                data = data[newline + 1:] if newline >= 0 else b""
+                skip_line = newline < 0
+            cut = data.rfind(b"\n") + 1 if chunk else len(data)
+            # a document cut inside a letter can only end with a broken line
+            text = pending + data[:cut].decode("utf-8", "strict" if chunk else "replace")
+            tail = data[cut:]
+            while header_lines and "\n" in text:
+                text = text[text.index("\n") + 1:]
+                header_lines -= 1
+            if not skipping:
+                position = 0
+                while match := RECORD.match(text, position):
+                    position = match.end()
+                    number, name, status, score, average = match.groups()
+                    records += 1
+                    yield [number, name, "+" if status == "До наказу" else "-",
+                           score, average]
+                text = text[position:]
+            pieces = SEPARATOR.split(text)
+            pending = pieces.pop() if chunk else ""
+            if skipping:
+                if pieces:
+                    # the rest of the dropped record ends at the first separator
+                    del pieces[0]
+                    skipping = False
+                else:
+                    pending = ""
+            if len(tail) + 4 * len(pending) > max_record_size and \
+                    len(tail) + len(pending.encode("utf-8")) > max_record_size:
+                if not skipping:
+                    skipped += 1
+                    skipping = True
+                pending = ""
+                if tail:
+                    tail, skip_line = b"", True
+            for piece in pieces:
+                if not piece.strip():
+                    continue
+                info = _parse_record(piece)
+                if info is None:
+                    skipped += 1
+                    continue
+                records += 1
+                yield info
+            if not chunk:
+                break
+    if stats is not None:
+        seconds = time.perf_counter() - start
+        stats.update(records=records, skipped=skipped, bytes=size, seconds=seconds,
+                     records_per_second=records / seconds if seconds else 0.0,
+                     bytes_per_second=size / seconds if seconds else 0.0)
+
+
+def _read_line(file) -> str:
+    """Reads a line of bytes or text and returns it as text."""
+    line = file.readline()
+    if isinstance(line, bytes):
+        return line.decode("utf-8")
+    return line
+
+
+def _iter_students_by_line(source):
+    """
+    Yields the students of a ranking document reading it line by line.
+    It is the first version of iter_students, kept for the benchmark.
+
+    >>> list(_iter_students_by_line('ranking_example.txt')) == \
+            list(iter_students('ranking_example.txt'))
+    True
+    """
+    with open_source(source) as file:
+        for _ in range(2): #skipping first two lines
+            file.readline()
+
+        while True:
+            line = _read_line(file)
+            if not line.strip():
+                return
+            info = line.strip().split("\t")[:4]
+            info[2] = "+" if info[2] == "До наказу" else "-"
+            for _ in range(2):
+                file.readline()
+            line = _read_line(file)
+            info.append(line.strip().split("\t")[-1])
+            yield info
+
+            while line and line[0] != "–":
+                line = _read_line(file)
+
+
+def benchmark_parse(size: int = 16 * 2 ** 20) -> dict[str, dict[str, float]]:
+    """
+    Parses a synthetic ranking document of about size bytes from memory
+    line by line and by chunks, and returns the records and bytes per
+    second of both.
+    """
+    record = ("{}\tСтудент С. С.\tДо наказу\t190.000\t1\nБали НМТ\t190 195 198\n"
+              "Бал атестата\t11\nСередній бал документа\t10.80\n"
+              "–––––––––––––––––\n")
+    count = size // len(record.format(0).encode("utf-8"))
+    content = ("Рейтинговий список\nheader\n" +
+               "".join(record.format(i) for i in range(1, count + 1))).encode("utf-8")
+    result = {}
+    for name, parse in (("by_line", _iter_students_by_line), ("by_chunk", iter_students)):
+        start = time.perf_counter()
+        records = sum(1 for _ in parse(io.BytesIO(content)))
+        seconds = time.perf_counter() - start
+        assert records == count
+        result[name] = {"records_per_second": records / seconds,
+                        "bytes_per_second": len(content) / seconds}
+    return result
+
 
 def read_input_file(url: str, number: int) -> list[list[str]]:
     """
@@ -12,31 +252,238 @@ def read_input_file(url: str, number: int) -> list[list[str]]:
     [['1', 'Мацюк М. І.', '+', '197.859', '10.80'], ['2', 'Проць О. В.', '+', '197.152', '11.60'], \
 ['3', 'Лесько В. О.', '+', '195.385', '10.60']]
     """
-    with urllib.request.urlopen(url) as file:
-        for _ in range(2): #skipping first two lines
-            file.readline()
+    return list(islice(iter_students(url), number))
 
-        students = []
-        while len(students) < number:
-            line = file.readline().decode("utf-8")
-            info = line.strip().split("\t")[:4]
-            info[2] = "+" if info[2] == "До наказу" else "-"
-            for _ in range(2): 
-                file.readline()
-            line = file.readline().decode("utf-8")
-            info.append(line.strip().split("\t")[-1])
-            students.append(info)
 
-            while line[0] != "–":
-                line = file.readline().decode("utf-8")
-        return students
-        
+def write_csv_file(url: str, file_name: str = "total.csv", batch: int = 1000) -> int:
+    '''write info to csv file with the path total.csv
+
+    The students are written in batches of rows as they are read, so the
+    whole document is never kept in memory. url may also be a file name
+    or a file-like object. Returns the number of students written.
+
+    >>> write_csv_file('ranking_example.txt', 'total.csv')
+    4
+    >>> with open('total.csv', encoding='utf-8') as file:
+    ...     print(file.readline().strip())
+    1,Мацюк М. І.,+,197.859,10.80
+    '''
+    count = 0
+    with open(file_name, "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file)
+        students = iter_students(url)
+        while True:
+            rows = list(islice(students, batch))
+            if not rows:
+                return count
+            writer.writerows(rows)
+            count += len(rows)
+
+
+class DocumentFetcher:
+    """
+    Fetches many documents over HTTP(S) at once.
+
+    Every worker thread keeps one open connection per host and reuses it
+    for the next requests to that host, at most per_host requests go to
+    a host at a time, and failed requests (network errors and 5xx answers)
+    are repeated up to retries times with a growing pause. With cache_dir
+    the answers are saved on disk with their ETag; the next fetch of the
+    url asks the server with If-None-Match and takes the saved document
+    if the server answers 304 Not Modified.
 
+    >>> import http.server, tempfile
+    >>> with open('ranking_example.txt', 'rb') as file:
+    ...     document = file.read()
+    >>> answers = []
+    >>> class Handler(http.server.BaseHTTPRequestHandler):
+    ...     protocol_version = "HTTP/1.1"
+    ...     def do_GET(self):
+    ...         if self.path == "/flaky" and not answers:
+    ...             status, body = 503, b""
+    ...         elif self.headers.get("If-None-Match") == '"v1"':
+    ...             status, body = 304, b""
+    ...         else:
+    ...             status, body = 200, document
+    ...         answers.append((self.path, status))
+    ...         self.send_response(status)
+    ...         self.send_header("ETag", '"v1"')
+    ...         self.send_header("Content-Length", str(len(body)))
+    ...         self.end_headers()
+    ...         self.wfile.write(body)
+    ...     def log_message(self, *args):
+    ...         pass
+    >>> server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    >>> threading.Thread(target=server.serve_forever, daemon=True).start()
+    >>> base = f"http://127.0.0.1:{server.server_port}"
+    >>> fetcher = DocumentFetcher(tempfile.mkdtemp(), backoff=0)
+    >>> fetcher.fetch(base + "/flaky") == document, answers
+    (True, [('/flaky', 503), ('/flaky', 200)])
+    >>> fetcher.fetch(base + "/flaky") == document, answers[-1]
+    (True, ('/flaky', 304))
+    >>> sorted((url[len(base):], [el[1] for el in students]) for url, students
+    ...        in read_input_files([base + "/a", base + "/b"], 2, fetcher))
+    [('/a', ['Мацюк М. І.', 'Проць О. В.']), ('/b', ['Мацюк М. І.', 'Проць О. В.'])]
+    >>> server.shutdown()
+    >>> server.server_close()
+    """
+
+    def __init__(self, cache_dir: str | None = None, per_host: int = 4,
+                 retries: int = 3, timeout: float = 30, backoff: float = 0.5):
+        self.cache_dir = cache_dir
+        self.per_host = per_host
+        self.retries = retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self._limits = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _limit(self, host: str) -> threading.Semaphore:
+        """Returns the semaphore that limits the requests to the host."""
+        with self._lock:
+            if host not in self._limits:
+                self._limits[host] = threading.BoundedSemaphore(self.per_host)
+            return self._limits[host]
+
+    def _connection(self, scheme: str, host: str) -> http.client.HTTPConnection:
+        """Returns the open connection of this thread to the host."""
+        connections = self._local.__dict__.setdefault("connections", {})
+        connection = connections.get((scheme, host))
+        if connection is None:
+            if scheme == "https":
+                connection = http.client.HTTPSConnection(host, timeout=self.timeout)
+            else:
+                connection = http.client.HTTPConnection(host, timeout=self.timeout)
+            connections[(scheme, host)] = connection
+        return connection
+
+    def _drop_connection(self, scheme: str, host: str):
+        """Closes the connection of this thread to the host."""
+        connection = self._local.__dict__.get("connections", {}).pop((scheme, host), None)
+        if connection is not None:
+            connection.close()
+
+    def _request(self, url: str, headers: dict):
+        """
+        Sends a GET request, repeating it on failures, and returns
+        the status, the headers and the body of the answer.
+        """
+        parts = urlsplit(url)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        for attempt in range(self.retries + 1):
+            try:
+                with self._limit(parts.netloc):
+                    connection = self._connection(parts.scheme, parts.netloc)
+                    connection.request("GET", path, headers=headers)
+                    response = connection.getresponse()
+                    body = response.read()
+                if response.will_close:
+                    self._drop_connection(parts.scheme, parts.netloc)
+                if response.status < 500 or attempt == self.retries:
+                    return response.status, response.headers, body
+            except (OSError, http.client.HTTPException):
+                self._drop_connection(parts.scheme, parts.netloc)
+                if attempt == self.retries:
+                    raise
+            time.sleep(self.backoff * 2 ** attempt)
+
+    def _cache_path(self, *key: str) -> str:
+        """Returns the path of the cache file for the key."""
+        name = hashlib.sha256("\n".join(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, name)
+
+    def _read_cache(self, url: str) -> tuple[str | None, bytes | None]:
+        """Returns the saved ETag and document of the url, if any."""
+        if self.cache_dir is None:
+            return None, None
+        try:
+            with open(self._cache_path(url), "r", encoding="utf-8") as file:
+                etag = file.read()
+            with open(self._cache_path(url, etag), "rb") as file:
+                return etag, file.read()
+        except OSError:
+            return None, None
+
+    def _write_cache(self, url: str, etag: str, body: bytes):
+        """Saves the document of the url with its ETag."""
+        old_etag = self._read_cache(url)[0]
+        for path, content, mode in ((self._cache_path(url, etag), body, "wb"),
+                                    (self._cache_path(url), etag, "w")):
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, mode, **({} if "b" in mode else {"encoding": "utf-8"})) as file:
+                file.write(content)
+            os.replace(temp_path, path)
+        if old_etag is not None and old_etag != etag:
+            try:
+                os.remove(self._cache_path(url, old_etag))
+            except OSError:
+                pass
 
-def write_csv_file(url: str):
-    '''write info to csv file with the path total.csv'''
-    pass
+    def fetch(self, url: str) -> bytes:
+        """Returns the document of the url, following redirects."""
+        etag, cached = self._read_cache(url)
+        headers = {"If-None-Match": etag} if etag is not None else {}
+        location = url
+        for _ in range(MAX_REDIRECTS + 1):
+            status, response_headers, body = self._request(location, headers)
+            if status not in REDIRECT_STATUSES:
+                break
+            location = urljoin(location, response_headers["Location"])
+        if status == 304 and cached is not None:
+            return cached
+        if status != 200:
+            raise urllib.error.HTTPError(location, status, f"HTTP {status}",
+                                         response_headers, None)
+        new_etag = response_headers.get("ETag")
+        if self.cache_dir is not None and new_etag is not None:
+            self._write_cache(url, new_etag, body)
+        return body
+
+    def fetch_all(self, urls, workers: int = 8):
+        """
+        Fetches the urls in a pool of worker threads and yields pairs
+        (url, document) as the documents come.
+        """
+        with ThreadPoolExecutor(workers) as pool:
+            futures = {pool.submit(self.fetch, url): url for url in urls}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+
+def read_input_files(urls, number: int, fetcher: DocumentFetcher | None = None,
+                     workers: int = 8):
+    """
+    Fetches many ranking documents at once and yields pairs
+    (url, list of the first number students) as they come.
+    """
+    fetcher = DocumentFetcher() if fetcher is None else fetcher
+    for url, content in fetcher.fetch_all(urls, workers):
+        yield url, list(islice(iter_students(io.BytesIO(content)), number))
+
+
+def benchmark_fetch(urls, workers: int = 8, fetcher: DocumentFetcher | None = None) \
+        -> dict[str, float]:
+    """
+    Fetches the urls one by one with urlopen and with DocumentFetcher,
+    and returns the documents per second of both.
+    """
+    urls = list(urls)
+    start = time.perf_counter()
+    for url in urls:
+        with urllib.request.urlopen(url) as file:
+            file.read()
+    urlopen_time = time.perf_counter() - start
+    fetcher = DocumentFetcher() if fetcher is None else fetcher
+    start = time.perf_counter()
+    for _ in fetcher.fetch_all(urls, workers):
+        pass
+    fetcher_time = time.perf_counter() - start
+    return {"urlopen": len(urls) / urlopen_time,
+            "DocumentFetcher": len(urls) / fetcher_time}
 
 if __name__ == '__main__':
     import doctest
-    print(doctest.testmod())
\ No newline at end of file
+    print(doctest.testmod())
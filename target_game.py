@@ -1,45 +1,497 @@
 """game target"""
+import mmap
+import multiprocessing
+import os
 import random
-def generate_grid() -> list[list[str]]:
+import struct
+import time
+from array import array
+from bisect import bisect_left
+from functools import partial
+
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+VOWELS = ['A', 'E', 'I', 'O','U']
+CONSONANTS = ['B', 'C', 'D', 'F', 'G', 'H', 'J','K','L','M','N','P','Q','R',\
+              'S','T','V','W','X','Y','Z']
+LANE = 6
+GUARD = sum(1 << (LANE * i + LANE - 1) for i in range(len(ALPHABET)))
+COUNTS_SIZE = (LANE * len(ALPHABET) + 7) // 8
+INDEX_SUFFIX = '.idx'
+INDEX_MAGIC = b'TGIDX003'
+INDEX_HEADER = struct.Struct('<8sQQIIQ')
+SUBMASK_LIMIT = 16
+_DICTIONARIES = {}
+_WORD_GRAPHS = {}
+_LETTER_STATS = {}
+
+def generate_grid(size: int = 3) -> list[list[str]]:
     """
     Generates list of lists of letters - i.e. grid for the game.
     e.g. [['I', 'G', 'E'], ['P', 'I', 'S'], ['W', 'M', 'G']]
+    A third of the letters are vowels.
     """
-    vowels = ['A', 'E', 'I', 'O','U']
-    consonants = ['B', 'C', 'D', 'F', 'G', 'H', 'J','K','L','M','N','P','Q','R',\
-                  'S','T','V','W','X','Y','Z']
-    vowels = random.choices(vowels, k=3)
-    consonants = random.choices(consonants, k=6)
+    vowels = random.choices(VOWELS, k=size * size // 3)
+    consonants = random.choices(CONSONANTS, k=size * size - len(vowels))
     letters = vowels + consonants
     random.shuffle(letters)
-    grid = [letters[i:i+3] for i in range(0, len(letters), 3)]
+    grid = [letters[i:i+size] for i in range(0, len(letters), size)]
     return grid
 
-def get_words(f: str, letters: list[str]) -> list[str]:
+def letter_mask(word: str) -> int:
     """
-    Reads the file f. Checks the words with rules and returns a list of words.
+    Returns a 26-bit mask of the letters used in the word.
+
+    >>> bin(letter_mask('cab'))
+    '0b111'
+    """
+    mask = 0
+    for el in word:
+        mask |= 1 << (ord(el) - 97)
+    return mask
+
+
+def letter_counts(word: str) -> int:
+    """
+    Packs the letter counts of the word into an int with one 6-bit slot
+    per letter. The top bit of every slot is left free, so a whole
+    count vector is compared in one subtraction (see Dictionary.query).
+
+    >>> letter_counts('abba') == 2 + (2 << 6)
+    True
+    """
+    counts = 0
+    for el in word:
+        counts += 1 << (LANE * (ord(el) - 97))
+    return counts
+
+
+def build_index(path: str) -> bytes:
     """
-    with open(f"week7/{f}", "r", encoding="utf-8") as file:
+    Reads the dictionary file and compiles the index of the words that
+    can ever be valid in the game: lowercase latin words of at least
+    4 letters, without repeats, numbered in sorted order.
+
+    The index is a header followed by flat arrays: offsets of the words
+    in the dictionary file, the sorted distinct letter masks of the words
+    with the numbers of the words of every mask, packed letter counts
+    and word lengths.
+    """
+    with open(path, "rb") as file:
         content = file.read()
-        words = content.splitlines()
-        words = [el for el in words if letters[4] in el and len(el)>=4 and el.islower()]
-        words_set = set(words)
-        words = list(words_set)
-        checked_words = []
-        for word in words:
-            check = True
-            for el in word:
-                count_letters = letters.count(el)
-                count_letters_in_word = word.count(el)
-                if count_letters == 0:
-                    check = False
-                    break
-                if count_letters_in_word > count_letters:
-                    check = False
+    first = {}
+    start = 0
+    for line in content.split(b'\n'):
+        word = line.rstrip(b'\r')
+        if len(word) >= 4 and word.isalpha() and word.islower() \
+                and word not in first:
+            first[word] = start
+        start += len(line) + 1
+    words = sorted(first)
+    offsets = array('I', (first[el] for el in words))
+    groups = {}
+    for i, el in enumerate(words):
+        groups.setdefault(letter_mask(el.decode()), array('I')).append(i)
+    group_masks = array('I', sorted(groups))
+    group_starts = array('I', [0])
+    for mask in group_masks:
+        group_starts.append(group_starts[-1] + len(groups[mask]))
+    stat = os.stat(path)
+    parts = [offsets.tobytes(), group_masks.tobytes(), group_starts.tobytes()]
+    parts += [groups[mask].tobytes() for mask in group_masks]
+    parts += [letter_counts(el.decode()).to_bytes(COUNTS_SIZE, 'little')
+              for el in words]
+    parts.append(bytes(len(el) for el in words))
+    total = INDEX_HEADER.size + sum(len(el) for el in parts)
+    header = INDEX_HEADER.pack(INDEX_MAGIC, stat.st_size, stat.st_mtime_ns,
+                               len(words), len(group_masks), total)
+    return header + b''.join(parts)
+
+
+class Dictionary:
+    """
+    Dictionary of the game words shared by the whole process.
+
+    Both the dictionary file and its compiled index (path + '.idx') are
+    memory-mapped, so the words are only offsets into the shared buffer
+    and are decoded when a board asks for them. The index is compiled on
+    the first use and recompiled when the dictionary file changes.
+    Worker processes forked after the dictionary is opened share its
+    pages with the parent.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            self.content = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        stat = os.stat(path)
+        self.index = self._open_index((stat.st_size, stat.st_mtime_ns))
+        size, groups = INDEX_HEADER.unpack_from(self.index)[3:5]
+        view = memoryview(self.index)
+        pos = INDEX_HEADER.size
+        self.size = size
+        self.offsets = view[pos:pos + 4 * size].cast('I')
+        pos += 4 * size
+        self.group_masks = view[pos:pos + 4 * groups].cast('I')
+        pos += 4 * groups
+        self.group_starts = view[pos:pos + 4 * (groups + 1)].cast('I')
+        pos += 4 * (groups + 1)
+        self.members = view[pos:pos + 4 * size].cast('I')
+        pos += 4 * size
+        self.counts = view[pos:pos + COUNTS_SIZE * size]
+        pos += COUNTS_SIZE * size
+        self.lengths = view[pos:pos + size]
+
+    def _open_index(self, source: tuple[int, int]) -> mmap.mmap:
+        """
+        Maps the compiled index of the dictionary, compiling it first
+        if it is missing, cut short or was built from another version
+        of the file. A new index is written to a temporary file and moved
+        into place, so processes that have the old one mapped keep
+        reading it intact.
+        """
+        index_path = self.path + INDEX_SUFFIX
+        try:
+            with open(index_path, "rb") as file:
+                header = file.read(INDEX_HEADER.size)
+                if len(header) == INDEX_HEADER.size:
+                    magic, *version, _, _, total = INDEX_HEADER.unpack(header)
+                    if (magic, *version) == (INDEX_MAGIC, *source) and \
+                            os.fstat(file.fileno()).st_size == total:
+                        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except OSError:
+            pass
+        content = build_index(self.path)
+        temp_path = f"{index_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "wb") as file:
+                file.write(content)
+            os.replace(temp_path, index_path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            # the index can't be saved, so keep it only in memory
+            buffer = mmap.mmap(-1, len(content))
+            buffer.write(content)
+            return buffer
+        with open(index_path, "rb") as file:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def word(self, i: int) -> str:
+        """
+        Returns the i-th word of the index.
+        """
+        start = self.offsets[i]
+        return self.content[start:start + self.lengths[i]].decode()
+
+    def groups(self, board_mask: int, center_mask: int):
+        """
+        Yields the numbers of the mask groups whose letters all are on
+        the board and include the center letters. Small boards enumerate
+        the submasks of the board, big ones scan all the groups.
+        """
+        group_masks = self.group_masks
+        if board_mask.bit_count() <= SUBMASK_LIMIT:
+            rest = board_mask & ~center_mask
+            sub = rest
+            while True:
+                mask = sub | center_mask
+                i = bisect_left(group_masks, mask)
+                if i < len(group_masks) and group_masks[i] == mask:
+                    yield i
+                if sub == 0:
                     break
-            if check is True:
-                checked_words.append(word)
-        return sorted(checked_words)
+                sub = (sub - 1) & rest
+        else:
+            outside = ~board_mask
+            for i, mask in enumerate(group_masks):
+                if not mask & outside and mask & center_mask == center_mask:
+                    yield i
+
+    def query(self, letters: list[str], center: str | None = None) -> list[str]:
+        """
+        Returns sorted words that contain the center letter (the middle
+        of the board by default) and can be made of the letters of the board.
+        """
+        center = letters[4] if center is None else center
+        board_counts = letter_counts(letters) | GUARD
+        counts, members, starts = self.counts, self.members, self.group_starts
+        found = []
+        for group in self.groups(letter_mask(letters), letter_mask(center)):
+            for i in members[starts[group]:starts[group + 1]]:
+                word_counts = int.from_bytes(
+                    counts[i * COUNTS_SIZE:(i + 1) * COUNTS_SIZE], 'little')
+                if (board_counts - word_counts) & GUARD == GUARD:
+                    found.append(i)
+        found.sort()
+        return [self.word(i) for i in found]
+
+
+def get_dictionary(path: str) -> Dictionary:
+    """
+    Returns the dictionary of the file, opening it once per process.
+    """
+    dictionary = _DICTIONARIES.get(path)
+    if dictionary is None:
+        dictionary = _DICTIONARIES[path] = Dictionary(path)
+    return dictionary
+
+
+class WordGraph:
+    """
+    Compact directed acyclic word graph (a trie with equal suffixes merged).
+
+    Nodes are numbered so that the edges of node i are
+    edges[first_edge[i]:first_edge[i + 1]], sorted by letter; the edge
+    letters are stored as numbers 0..25. Children are numbered before
+    their parents, so the root is the last node, self.root.
+
+    >>> graph = WordGraph(['abcd', 'abce', 'bbcd'])
+    >>> graph.root == len(graph.terminal) - 1
+    True
+    """
+
+    def __init__(self, words):
+        self.letters = array('B')
+        self.children = array('I')
+        self.first_edge = array('I')
+        self.terminal = bytearray()
+        register = {}
+        # stack of [letter, terminal, [(letter, child), ...]] for the
+        # nodes of the current word that are not finished yet
+        stack = [[None, False, []]]
+        previous = ''
+        for word in words:
+            common = 0
+            while common < min(len(word), len(previous)) and \
+                    word[common] == previous[common]:
+                common += 1
+            while len(stack) > common + 1:
+                self._finish(stack, register)
+            for el in word[common:]:
+                stack.append([ord(el) - 97, False, []])
+            stack[-1][1] = True
+            previous = word
+        while len(stack) > 1:
+            self._finish(stack, register)
+        self.root = self._add_node(False, tuple(stack[0][2]), register)
+        self.first_edge.append(len(self.letters))
+
+    def _finish(self, stack: list, register: dict):
+        """
+        Turns the last node of the stack into a graph node and adds
+        the edge to it to its parent.
+        """
+        letter, terminal, edges = stack.pop()
+        node = self._add_node(terminal, tuple(edges), register)
+        stack[-1][2].append((letter, node))
+
+    def _add_node(self, terminal: bool, edges: tuple, register: dict) -> int:
+        """
+        Returns the number of the equal node if there is one,
+        or adds a new node.
+        """
+        key = (terminal, edges)
+        node = register.get(key)
+        if node is None:
+            node = register[key] = len(self.terminal)
+            self.terminal.append(terminal)
+            self.first_edge.append(len(self.letters))
+            for letter, child in edges:
+                self.letters.append(letter)
+                self.children.append(child)
+        return node
+
+    def __len__(self) -> int:
+        return len(self.terminal)
+
+    def solve(self, letters: list[str], required: str = '',
+              min_length: int = 4) -> list[str]:
+        """
+        Returns sorted words of at least min_length letters that can be
+        made of the letters (every letter is used at most as many times
+        as it is given) and contain every required letter.
+
+        The graph is walked depth-first and a branch is left as soon as
+        there are no letters left for it, so the work depends on the
+        words that can be made, not on the size of the dictionary.
+        """
+        remaining = [0] * len(ALPHABET)
+        for el in letters:
+            remaining[ord(el) - 97] += 1
+        needed = [0] * len(ALPHABET)
+        for el in set(required):
+            needed[ord(el) - 97] = 1
+        edge_letters, children = self.letters, self.children
+        first_edge, terminal = self.first_edge, self.terminal
+        found = []
+        path = []
+
+        def walk(node: int, missing: int):
+            for i in range(first_edge[node], first_edge[node + 1]):
+                letter = edge_letters[i]
+                if not remaining[letter]:
+                    continue
+                child = children[i]
+                left = missing - needed[letter]
+                needed_letter = needed[letter]
+                needed[letter] = 0
+                remaining[letter] -= 1
+                path.append(ALPHABET[letter])
+                if terminal[child] and not left and len(path) >= min_length:
+                    found.append(''.join(path))
+                walk(child, left)
+                path.pop()
+                remaining[letter] += 1
+                needed[letter] = needed_letter
+
+        walk(self.root, sum(needed))
+        return found
+
+
+def get_word_graph(path: str) -> WordGraph:
+    """
+    Returns the word graph of the dictionary file, building it once
+    per process.
+    """
+    graph = _WORD_GRAPHS.get(path)
+    if graph is None:
+        dictionary = get_dictionary(path)
+        words = (dictionary.word(i) for i in range(len(dictionary)))
+        graph = _WORD_GRAPHS[path] = WordGraph(words)
+    return graph
+
+
+def find_words(f: str, letters: list[str], required: str | None = None) -> list[str]:
+    """
+    Reads the file f and returns the words that can be made of the
+    letters of a grid of any size and contain all required letters.
+    By default the required letter is the center of the grid.
+    """
+    if required is None:
+        required = letters[len(letters) // 2]
+    return get_word_graph(f"week7/{f}").solve(letters, required)
+
+
+def get_words(f: str, letters: list[str]) -> list[str]:
+    """
+    Reads the file f. Checks the words with rules and returns a list of words.
+    """
+    return get_dictionary(f"week7/{f}").query(letters)
+
+
+def _solve_board(path: str, grid: list[list[str]]) -> tuple[list[list[str]], list[str]]:
+    """
+    Solves one grid with the dictionary of the process.
+    """
+    letters = [el.lower() for row in grid for el in row]
+    return grid, get_dictionary(path).query(letters)
+
+
+def solve_boards(grids, f: str = 'en.txt', processes: int | None = None,
+                 chunksize: int = 256):
+    """
+    Solves many grids and yields (grid, words) pairs in the order of grids.
+
+    The dictionary is opened once before the worker processes start, so
+    forked workers share it instead of loading their own copy. With
+    processes=1 the grids are solved in the current process.
+    """
+    path = f"week7/{f}"
+    get_dictionary(path)
+    if processes == 1:
+        for grid in grids:
+            yield _solve_board(path, grid)
+        return
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+    else:
+        context = multiprocessing.get_context()
+    with context.Pool(processes) as pool:
+        yield from pool.imap(partial(_solve_board, path), grids, chunksize)
+
+
+def benchmark_solve_boards(count: int = 10000, f: str = 'en.txt',
+                           processes: int | None = None) -> dict[str, float]:
+    """
+    Solves the same random grids with repeated get_words calls and with
+    solve_boards, and returns the throughput of both in boards per second.
+    """
+    grids = [generate_grid() for _ in range(count)]
+    get_dictionary(f"week7/{f}")
+    start = time.perf_counter()
+    for grid in grids:
+        get_words(f, [el.lower() for row in grid for el in row])
+    get_words_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in solve_boards(grids, f, processes):
+        pass
+    solve_boards_time = time.perf_counter() - start
+    return {'get_words': count / get_words_time,
+            'solve_boards': count / solve_boards_time}
+
+
+def get_letter_stats(path: str) -> list[list[int]]:
+    """
+    Returns a 26x26 table of the dictionary: the cell [i][j] is the number
+    of words that contain both the i-th and the j-th letters, and the
+    cell [i][i] is the number of words that contain the i-th letter.
+    The table is counted once per process from the mask groups of the index.
+    """
+    stats = _LETTER_STATS.get(path)
+    if stats is None:
+        dictionary = get_dictionary(path)
+        stats = [[0] * len(ALPHABET) for _ in ALPHABET]
+        starts = dictionary.group_starts
+        for group, mask in enumerate(dictionary.group_masks):
+            size = starts[group + 1] - starts[group]
+            used = [i for i in range(len(ALPHABET)) if mask >> i & 1]
+            for i in used:
+                row = stats[i]
+                for j in used:
+                    row[j] += size
+        _LETTER_STATS[path] = stats
+    return stats
+
+
+def generate_grid_with_words(min_words: int, max_words: int, f: str = 'en.txt',
+                             attempts: int = 10000):
+    """
+    Generates a 3x3 grid whose number of words is between min_words and
+    max_words inclusive. The center letter is drawn by the number of words
+    with it and the other letters by the number of words they share with
+    the center, keeping 3 vowels and 6 consonants like generate_grid.
+
+    Returns a tuple (grid, words, rejected, seconds) with the number of
+    rejected candidate grids and the time spent, or None if no grid is
+    found in the given number of attempts.
+    """
+    path = f"week7/{f}"
+    start = time.perf_counter()
+    dictionary = get_dictionary(path)
+    stats = get_letter_stats(path)
+    alphabet = VOWELS + CONSONANTS
+    center_weights = [stats[ord(el.lower()) - 97][ord(el.lower()) - 97]
+                      for el in alphabet]
+    for rejected in range(attempts):
+        center = random.choices(alphabet, weights=center_weights)[0]
+        row = stats[ord(center.lower()) - 97]
+        vowels_count = 3 - (center in VOWELS)
+        letters = random.choices(VOWELS, k=vowels_count,
+                                 weights=[row[ord(el.lower()) - 97] for el in VOWELS])
+        letters += random.choices(CONSONANTS, k=8 - vowels_count,
+                                  weights=[row[ord(el.lower()) - 97] for el in CONSONANTS])
+        random.shuffle(letters)
+        letters.insert(4, center)
+        words = dictionary.query([el.lower() for el in letters])
+        if min_words <= len(words) <= max_words:
+            grid = [letters[i:i+3] for i in range(0, len(letters), 3)]
+            return grid, words, rejected, time.perf_counter() - start
+    return None
 
 
 def get_user_words() -> list[str]:
@@ -65,9 +517,64 @@ def get_pure_user_words(user_words: list[str], letters: list[str],\
     Checks user words with the rules and returns list of those words
     that are not in dictionary.
     """
-    words = [el for el in user_words if letters[4] in el and len(el)>=4 and el.islower()]
-    words = [el for el in words if el not in words_from_dict]
-    return words
+    return score_words(user_words, letters, words_from_dict)[2]
+
+
+def score_words(user_words: list[str], letters: list[str],\
+                words_from_dict: list[str], required: str | None = None) \
+        -> tuple[list[str], list[str], list[str]]:
+    """
+    Scores user words against the words of the board in one pass over
+    each list. Returns the right words (in the order of the user words),
+    the missed words (in the order of the dictionary words) and the words
+    that follow the rules but are not in the dictionary. A word follows
+    the rules if it contains all required letters, by default the center
+    of the grid as in find_words.
+
+    >>> score_words(['tear', 'rate', 'tare', 'tear', 'era'], list('xxxxaxxxx'),\
+                    ['rate', 'tear', 'teary'])
+    (['tear', 'rate', 'tear'], ['teary'], ['tare'])
+    >>> score_words(['mmmm', 'eeee'], [chr(97 + i) for i in range(25)], [])
+    ([], [], ['mmmm'])
+    """
+    dictionary = set(words_from_dict)
+    if required is None:
+        required = letters[len(letters) // 2]
+    right_words, pure_words = [], []
+    for word in user_words:
+        if word in dictionary:
+            right_words.append(word)
+        elif len(word) >= 4 and word.islower() and all(el in word for el in required):
+            pure_words.append(word)
+    guessed = set(right_words)
+    missed_words = [word for word in words_from_dict if word not in guessed]
+    return right_words, missed_words, pure_words
+
+
+def benchmark_score_words(count: int = 10000, f: str = 'en.txt') -> dict[str, float]:
+    """
+    Scores a list of count guesses for a 5x5 grid with list membership
+    checks and with score_words, and returns the time of both in seconds.
+    """
+    letters = [el.lower() for row in generate_grid(5) for el in row]
+    words_from_dict = find_words(f, letters)
+    dictionary = get_dictionary(f"week7/{f}")
+    user_words = [dictionary.word(random.randrange(len(dictionary)))
+                  for _ in range(count - len(words_from_dict) // 2)]
+    user_words += words_from_dict[::2]
+    random.shuffle(user_words)
+    start = time.perf_counter()
+    right_words = [word for word in user_words if word in words_from_dict]
+    missed_words = [word for word in words_from_dict if word not in user_words]
+    required = letters[len(letters) // 2]
+    pure_words = [el for el in user_words if required in el and len(el)>=4
+                  and el.islower() and el not in words_from_dict]
+    lists_time = time.perf_counter() - start
+    start = time.perf_counter()
+    result = score_words(user_words, letters, words_from_dict, required)
+    score_time = time.perf_counter() - start
+    assert result == (right_words, missed_words, pure_words)
+    return {'lists': lists_time, 'score_words': score_time}
 
 
 def main():
@@ -80,14 +587,15 @@ def main():
     print('Please, suggest your words here:')
     user_words = get_user_words()
     words_from_dict = get_words('en.txt',letters)
-    right_words = [word for word in user_words if word in words_from_dict]
+    right_words, missed_words, pure_words = score_words(user_words, letters,
+                                                        words_from_dict)
     print(f"Number of the right words: {len(right_words)}")
     print("All possible words:")
     print(words_from_dict)
-    missed_words = [word for word in words_from_dict if word not in user_words]
     print('You missed the followind words:')
     print(missed_words)
     print("You suggest, but we don't have them in the dictionary:")
-    print(get_pure_user_words(user_words, letters, words_from_dict))
+    print(pure_words)
 
-main()
\ No newline at end of file
+if __name__ == '__main__':
+    main()
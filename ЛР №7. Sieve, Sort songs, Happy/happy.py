@@ -1,10 +1,49 @@
 """Module for operations with happy numbers"""
-def happy_number(number: int) -> bool:
+import random
+import time
+from array import array
+from itertools import chain
+
+
+def digital_root(number: int) -> int:
+    """
+    Returns the digital root of a non-negative number, i.e. the digit
+    obtained by summing its digits until a single digit is left.
+    The digit sum keeps the number modulo 9, so no digits are needed.
+
+    >>> digital_root(0), digital_root(9), digital_root(1234)
+    (0, 9, 1)
+    """
+    if number == 0:
+        return 0
+    return 1 + (number - 1) % 9
+
+
+HALF_ROOTS = bytes(digital_root(el) for el in range(10 ** 4))
+
+
+def _tail_digits(number: int, length: int) -> int:
+    """
+    Returns the number of digits in the second half of the ticket.
+    Tickets shorter than length digits are padded with zeros, longer
+    ones keep length // 2 digits in the first half.
+
+    >>> _tail_digits(1234, 8), _tail_digits(123456789, 8), _tail_digits(12, 5)
+    (4, 5, 3)
+    """
+    digits = length
+    while number >= 10 ** digits:
+        digits += 1
+    return digits - length // 2
+
+
+def happy_number(number: int, length: int = 8) -> bool:
     """
     Determines if a ticket number is a happy number.
 
     Parameters:
     num (int): The ticket number to check.
+    length (int): The number of digits in a ticket.
 
     Returns:
     bool: True if the ticket is a happy number, False otherwise.
@@ -15,15 +54,35 @@ def happy_number(number: int) -> bool:
     True
     >>> happy_number(159123)
     True
+    >>> happy_number(123006, 6)
+    True
+    >>> all(happy_number(el, length) == _happy_number_digits(el, length)\
+            for length in (4, 6, 7, 8, 10) for el in range(0, 10 ** 7, 997))
+    True
+    """
+    if number < 10 ** 8 and length == 8:
+        head, tail = divmod(number, 10 ** 4)
+        return HALF_ROOTS[head] == HALF_ROOTS[tail]
+    head, tail = divmod(number, 10 ** _tail_digits(number, length))
+    return digital_root(head) == digital_root(tail)
+
+
+def _happy_number_digits(number: int, length: int = 8) -> bool:
+    """
+    Determines if a ticket number is a happy number by summing the
+    digits of its halves as strings. It is the first version of
+    happy_number, kept to check and benchmark the arithmetic one.
+
+    >>> _happy_number_digits(32100123), _happy_number_digits(1234)
+    (True, False)
     """
     number = str(number)
-    if len(number)<8:
-        zero_q = 8 - len(number)
+    if len(number)<length:
+        zero_q = length - len(number)
         number = zero_q * "0" + number
     arr = [int(el) for el in number]
-    # print(arr[4:])
-    arr1 = arr[:4]
-    arr2 = arr[4:]
+    arr1 = arr[:length // 2]
+    arr2 = arr[length // 2:]
     while True:
         sum1 = str(sum(arr1))
         arr1 = [int(el) for el in sum1]
@@ -40,12 +99,86 @@ def happy_number(number: int) -> bool:
     return False
 
 
-def count_happy_numbers(n: int) -> int:
+def benchmark_happy_number(count: int = 10 ** 5, length: int = 8) -> dict[str, float]:
+    """
+    Checks count random tickets of the given length with the digit
+    and the arithmetic versions of happy_number, and returns the
+    mean time of one call of each in nanoseconds.
+    """
+    tickets = [random.randrange(10 ** length) for _ in range(count)]
+    result = {}
+    for name, check in (('digits', _happy_number_digits), ('arithmetic', happy_number)):
+        start = time.perf_counter_ns()
+        for el in tickets:
+            check(el, length)
+        result[name] = (time.perf_counter_ns() - start) / count
+    return result
+
+
+def _count_roots(root: int, limit: int) -> int:
+    """
+    Counts the numbers from 0 to limit inclusive with the given digital root.
+
+    >>> _count_roots(1, 19), _count_roots(9, 8), _count_roots(0, 5)
+    (3, 0, 1)
+    """
+    if limit < 0:
+        return 0
+    if root == 0:
+        return 1
+    if limit < root:
+        return 0
+    return (limit - root) // 9 + 1
+
+
+def _count_split(n: int, tail_digits: int) -> int:
+    """
+    Counts the numbers from 0 to n inclusive whose last tail_digits digits
+    and the rest of the digits have equal digital roots.
+    Numbers with the same head are counted together: the tails of all
+    smaller heads run over the whole range of tails.
+
+    >>> _count_split(10100, 4)
+    13
+    """
+    if n < 0:
+        return 0
+    size = 10 ** tail_digits
+    head, tail = divmod(n, size)
+    counter = _count_roots(digital_root(head), tail)
+    for root in range(10):
+        counter += _count_roots(root, head - 1) * _count_roots(root, size - 1)
+    return counter
+
+
+def _segments(m: int, n: int, length: int = 8):
+    """
+    Splits the range of tickets from m to n inclusive into parts whose
+    tickets have the same number of tail digits, and yields them as
+    tuples (lowest, highest, tail_digits), see _tail_digits.
+
+    >>> list(_segments(5, 10 ** 9))
+    [(5, 99999999, 4), (100000000, 999999999, 5), (1000000000, 1000000000, 6)]
+    """
+    m = max(m, 0)
+    if m <= min(n, 10 ** length - 1):
+        yield m, min(n, 10 ** length - 1), length - length // 2
+    digits = length + 1
+    while 10 ** (digits - 1) <= n:
+        lowest = max(m, 10 ** (digits - 1))
+        highest = min(n, 10 ** digits - 1)
+        if lowest <= highest:
+            yield lowest, highest, digits - length // 2
+        digits += 1
+
+
+def count_happy_numbers(n: int, length: int = 8) -> int:
     """
     Counts the number of happy tickets from 1 to n inclusive.
 
     Parameters:
     n (int): The upper limit of ticket numbers to check.
+    length (int): The number of digits in a ticket.
 
     Returns:
     int: The count of happy tickets in the range.
@@ -58,22 +191,65 @@ def count_happy_numbers(n: int) -> int:
     12
     >>> count_happy_numbers(100000)
     9999
+    >>> count_happy_numbers(10 ** 8)
+    11108889
+    >>> all(count_happy_numbers(n) == sum(map(happy_number, range(1, n + 1)))\
+            for n in range(9900, 10300, 7))
+    True
+    """
+    return count_happy_range(1, n, length)
+
+
+def count_happy_range(m: int, n: int, length: int = 8) -> int:
+    """
+    Counts the number of happy tickets from m to n inclusive.
+
+    >>> count_happy_range(10001, 10100)
+    12
+    >>> count_happy_range(99999000, 100001000) == \
+            sum(map(happy_number, range(99999000, 100001001)))
+    True
+    >>> count_happy_range(1, 10 ** 6, 6)
+    110889
+    >>> count_happy_range(0, 10)
+    1
     """
     counter = 0
-    arr = list(range(1, n+1))
-    for el in arr:
-        if happy_number(el):
-            counter += 1
+    for lowest, highest, tail_digits in _segments(m, n, length):
+        counter += _count_split(highest, tail_digits) - \
+            _count_split(lowest - 1, tail_digits)
     return counter
 
 
-def happy_numbers(m: int, n: int) -> list[int]:
+def _happy_ranges(m: int, n: int, length: int = 8):
+    """
+    Yields ranges that together hold all happy tickets from m to n inclusive.
+    For every head the tails with its digital root go with the step of 9.
+    """
+    for lowest, highest, tail_digits in _segments(m, n, length):
+        size = 10 ** tail_digits
+        for head in range(lowest // size, highest // size + 1):
+            base = head * size
+            root = digital_root(head)
+            lower = max(lowest - base, 0)
+            upper = min(highest - base, size - 1)
+            if root == 0:
+                if lower == 0:
+                    yield range(base, base + 1)
+                continue
+            lower = max(lower, 1)
+            lower += (root - lower) % 9
+            yield range(base + lower, base + upper + 1, 9)
+
+
+def happy_numbers(m: int, n: int, length: int = 8) -> list[int]:
     """
     Generates a list of happy ticket numbers within the given range.
 
     Parameters:
     m (int): The lower limit of ticket numbers (inclusive).
     n (int): The upper limit of ticket numbers (inclusive).
+    length (int): The number of digits in a ticket.
 
     Returns:
     list[int]: A list of happy ticket numbers in the range.
@@ -84,17 +260,66 @@ def happy_numbers(m: int, n: int) -> list[int]:
     [10001, 10010]
     >>> happy_numbers(1, 11)
     []
+    >>> happy_numbers(0, 10)
+    [0]
     >>> happy_numbers(10001, 10100)
     [10001, 10010, 10019, 10028, 10037, 10046, 10055, 10064, 10073, 10082, 10091, 10100]
+    >>> happy_numbers(99999990, 100000100) == \
+            [el for el in range(99999990, 100000101) if happy_number(el)]
+    True
+    """
+    return list(iter_happy_numbers(m, n, length))
+
+
+def iter_happy_numbers(m: int, n: int, length: int = 8):
+    """
+    Lazily yields happy ticket numbers from m to n inclusive in
+    increasing order, using constant memory.
+
+    >>> next(iter_happy_numbers(10002, 10 ** 9))
+    10010
     """
-    happy = []
-    arr = list(range(m, n+1))
-    for el in arr:
-        if happy_number(el):
-            happy.append(el)
-    return happy
+    return chain.from_iterable(_happy_ranges(m, n, length))
 
 
+def happy_number_blocks(m: int, n: int, size: int = 65536, length: int = 8):
+    """
+    Yields happy ticket numbers from m to n inclusive in arrays of
+    size numbers (the last one may be shorter). The arrays are filled
+    with whole ranges of tickets at once, without checking every ticket.
+
+    >>> [len(el) for el in happy_number_blocks(1, 100000, 4000)]
+    [4000, 4000, 1999]
+    """
+    block = array('Q')
+    for numbers in _happy_ranges(m, n, length):
+        block.extend(numbers)
+        while len(block) >= size:
+            yield block[:size]
+            del block[:size]
+    if block:
+        yield block
+
+
+def benchmark_happy_numbers(m: int = 10 ** 7, n: int = 2 * 10 ** 7) -> dict[str, float]:
+    """
+    Finds the happy tickets from m to n by checking every ticket with
+    happy_number, with iter_happy_numbers and with happy_number_blocks,
+    and returns the time of each way in seconds.
+    """
+    start = time.perf_counter()
+    checked = sum(1 for el in range(m, n + 1) if happy_number(el))
+    check_time = time.perf_counter() - start
+    start = time.perf_counter()
+    lazy = sum(1 for _ in iter_happy_numbers(m, n))
+    lazy_time = time.perf_counter() - start
+    start = time.perf_counter()
+    blocks = sum(len(el) for el in happy_number_blocks(m, n))
+    blocks_time = time.perf_counter() - start
+    assert checked == lazy == blocks
+    return {'happy_number': check_time, 'iter_happy_numbers': lazy_time,
+            'happy_number_blocks': blocks_time}
+
 
 if __name__ == '__main__':
     import doctest
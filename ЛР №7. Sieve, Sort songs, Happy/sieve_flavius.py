@@ -1,4 +1,209 @@
 """Module for finding lucky numbers"""
+import struct
+import time
+import tracemalloc
+from array import array
+from bisect import bisect_right
+from itertools import compress
+
+SLICE_LIMIT = 30
+
+
+def _find_kth(tree: array, rank: int) -> int:
+    """
+    Returns the index of the element with the given rank (counting from 1)
+    among the elements left in the Fenwick tree.
+
+    >>> _find_kth([0, 1, 2, 1, 4], 3)
+    2
+    """
+    pos = 0
+    step = 1 << (len(tree) - 1).bit_length()
+    while step:
+        nxt = pos + step
+        if nxt < len(tree) and tree[nxt] < rank:
+            pos = nxt
+            rank -= tree[nxt]
+        step >>= 1
+    return pos
+
+
+def _pop_kth(tree: array, rank: int) -> int:
+    """
+    Removes the element with the given rank (counting from 1) from
+    the Fenwick tree and returns its index. The nodes that hold the
+    element are the ones the search does not step over, so they are
+    updated on the way down.
+
+    >>> tree = [0, 1, 2, 1, 4]
+    >>> _pop_kth(tree, 3), tree
+    (2, [0, 1, 2, 0, 3])
+    """
+    pos = 0
+    step = 1 << (len(tree) - 1).bit_length()
+    while step:
+        nxt = pos + step
+        if nxt < len(tree):
+            if tree[nxt] < rank:
+                pos = nxt
+                rank -= tree[nxt]
+            else:
+                tree[nxt] -= 1
+        step >>= 1
+    return pos
+
+
+def _typecode(n: int) -> str:
+    """
+    Returns the typecode of the smallest unsigned array for numbers up to n.
+
+    >>> _typecode(100), _typecode(2 ** 40)
+    ('I', 'Q')
+    """
+    return 'I' if n < 2 ** 32 else 'Q'
+
+
+def _sieve_block(numbers: array, counts: array, block: array) -> array:
+    '''Sieves the block of odd numbers that follow the numbers already
+    sieved and returns the lucky numbers of the block.
+
+    numbers are the lucky numbers found before the block. counts[j - 1]
+    is how many of the earlier odd numbers came to the round that removes
+    every numbers[j]-th one; the rounds past the end of counts have not
+    removed anything yet, so all of numbers came to them. The block goes
+    through the rounds in order with the positions shifted by counts,
+    and counts is updated in place.
+
+    Rounds with small steps drop every k-th number with one slice
+    deletion. When the steps grow, the numbers are kept in place and a
+    Fenwick tree of the numbers left finds the k-th one in O(log n),
+    so a round costs as much as the numbers it removes.
+    '''
+    known = len(numbers)
+    j = 1
+    while True:
+        if j < known:
+            el = numbers[j]
+        elif j - known < len(block):
+            el = block[j - known]
+        else:
+            return block
+        came = counts[j - 1] if j <= len(counts) else known
+        if el > came + len(block) or el * SLICE_LIMIT > len(block):
+            break
+        _set_count(counts, j, came + len(block))
+        del block[(-came - 1) % el::el]
+        j += 1
+    count = len(block)
+    tree = array(block.typecode, (index & -index for index in range(count + 1)))
+    left = bytearray(b'\x01') * count
+    while True:
+        if j < known:
+            el = numbers[j]
+        elif j - known < count:
+            el = block[_find_kth(tree, j - known + 1)]
+        else:
+            break
+        came = counts[j - 1] if j <= len(counts) else known
+        if el > came + count:
+            break
+        first = el - came % el
+        last = count - (came + count) % el
+        for rank in range(last, first - 1, -el):
+            left[_pop_kth(tree, rank)] = 0
+        _set_count(counts, j, came + count)
+        count -= (last - first) // el + 1 if last >= first else 0
+        j += 1
+    del tree
+    return array(block.typecode, compress(block, left))
+
+
+def _set_count(counts: array, j: int, value: int):
+    '''Sets the count of the j-th round, see _sieve_block.'''
+    if j <= len(counts):
+        counts[j - 1] = value
+    else:
+        counts.append(value)
+
+
+class LuckySieve:
+    '''Lucky numbers sieved up to a limit that can be raised.
+
+    The sieve keeps the lucky numbers found so far and how many numbers
+    came to every round, so raising the limit sieves only the new numbers.
+    The state can be saved to a file and loaded back.
+
+    >>> sieve = LuckySieve()
+    >>> list(sieve.lucky_numbers(33))
+    [1, 3, 7, 9, 13, 15, 21, 25, 31, 33]
+    >>> list(sieve.lucky_numbers(100)) == sieve_flavius(100)
+    True
+    >>> list(sieve.lucky_numbers(10))
+    [1, 3, 7, 9]
+    '''
+
+    HEADER = struct.Struct('<8sQQQ1s')
+    MAGIC = b'LUCKY001'
+
+    def __init__(self):
+        self.limit = 0
+        self.numbers = array('I')
+        self.counts = array('I')
+
+    def extend(self, n: int):
+        '''Sieves the numbers up to n if they are not sieved yet.'''
+        if n <= self.limit:
+            return
+        typecode = _typecode(n)
+        if typecode != self.numbers.typecode:
+            self.numbers = array(typecode, self.numbers)
+            self.counts = array(typecode, self.counts)
+        block = array(typecode, range(self.limit + 1 + self.limit % 2, n + 1, 2))
+        self.numbers.extend(_sieve_block(self.numbers, self.counts, block))
+        self.limit = n
+
+    def lucky_numbers(self, n: int) -> array:
+        '''Returns an array of lucky numbers not exceeding n.'''
+        self.extend(n)
+        if n == self.limit:
+            return self.numbers[:]
+        return self.numbers[:bisect_right(self.numbers, n)]
+
+    def save(self, file_name: str):
+        '''Writes the state of the sieve to a binary file (native byte order).'''
+        with open(file_name, 'wb') as file:
+            file.write(self.HEADER.pack(self.MAGIC, self.limit, len(self.numbers),
+                                        len(self.counts),
+                                        self.numbers.typecode.encode()))
+            self.numbers.tofile(file)
+            self.counts.tofile(file)
+
+    @classmethod
+    def load(cls, file_name: str) -> 'LuckySieve':
+        '''Reads the state of a sieve written by save.'''
+        sieve = cls()
+        with open(file_name, 'rb') as file:
+            magic, sieve.limit, numbers, counts, typecode = \
+                cls.HEADER.unpack(file.read(cls.HEADER.size))
+            if magic != cls.MAGIC:
+                raise ValueError(f'{file_name} is not a lucky sieve checkpoint')
+            sieve.numbers = array(typecode.decode())
+            sieve.numbers.fromfile(file, numbers)
+            sieve.counts = array(typecode.decode())
+            sieve.counts.fromfile(file, counts)
+        return sieve
+
+
+def sieve_flavius_array(n: int) -> array:
+    '''Generates an array of lucky numbers not exceeding the given number n.
+    The numbers are kept in typed arrays, a few bytes per number.
+
+    >>> sieve_flavius_array(10)
+    array('I', [1, 3, 7, 9])
+    '''
+    return LuckySieve().lucky_numbers(n)
+
+
 def sieve_flavius(n: int) -> list[int]:
     '''Generates a list of lucky numbers not exceeding the given number n.
 
@@ -17,20 +222,57 @@ def sieve_flavius(n: int) -> list[int]:
     >>> sieve_flavius(0)
     []
     '''
-    arr = list(range(1,n+1))
-    for i in range(1, len(arr)//2+1):
-        arr.remove(2*i)
-    i = 1
-    while True:
-        try:
-            el = arr[i]
-            remove_arr = arr[el-1::el]
-            arr = [num for num in arr if num not in remove_arr]
-            i += 1
-        except IndexError:
-            return arr
+    return sieve_flavius_array(n).tolist()
+
+
+def iter_lucky_numbers(n: int, size: int = 65536):
+    '''Yields lucky numbers not exceeding n in arrays of size numbers.
+
+    >>> [list(el) for el in iter_lucky_numbers(33, 4)]
+    [[1, 3, 7, 9], [13, 15, 21, 25], [31, 33]]
+    '''
+    arr = sieve_flavius_array(n)
+    for start in range(0, len(arr), size):
+        yield arr[start:start + size]
+
+
+def write_lucky_numbers(n: int, file_name: str) -> int:
+    '''Writes lucky numbers not exceeding n to a binary file as unsigned
+    integers in the native byte order (4 bytes each for n < 2**32,
+    8 bytes otherwise) and returns how many numbers were written.
+    '''
+    count = 0
+    with open(file_name, 'wb') as file:
+        for arr in iter_lucky_numbers(n):
+            arr.tofile(file)
+            count += len(arr)
+    return count
+
+
+def read_lucky_numbers(file_name: str, n: int) -> array:
+    '''Reads lucky numbers written by write_lucky_numbers for the same n.'''
+    arr = array(_typecode(n))
+    with open(file_name, 'rb') as file:
+        arr.frombytes(file.read())
+    return arr
 
 
+def benchmark_sieve_flavius(limits: tuple[int, ...] = (10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7)) \
+        -> dict[int, tuple[float, int]]:
+    '''Returns the time of sieve_flavius_array(n) in seconds and its peak
+    memory in bytes for every n of limits. The memory is traced in a
+    second run, as tracing slows the sieve down.'''
+    result = {}
+    for n in limits:
+        start = time.perf_counter()
+        sieve_flavius_array(n)
+        seconds = time.perf_counter() - start
+        tracemalloc.start()
+        sieve_flavius_array(n)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        result[n] = (seconds, peak)
+    return result
 
 
 if __name__ == '__main__':
@@ -1,4 +1,11 @@
 """Module for sorting songs"""
+import csv
+import heapq
+import random
+import sys
+import tempfile
+import time
+from bisect import bisect_right
 from typing import Callable
 
 
@@ -55,6 +62,71 @@ def last_word(x: tuple[str]) -> str:
     return arr[-1][0]
 
 
+def key_column(song_titles: list[str], length_songs: list[str],
+               key: Callable[[tuple], int | str | float]) -> list:
+    '''Computes the values of the key for all songs at once.
+
+    The keys of this module are computed straight from the columns,
+    without building a tuple for every song; other keys get the tuples.
+
+    >>> key_column(['Той день', 'Сосни'], ['3.58', '4.31'], last_word)
+    ['д', 'С']
+    >>> key_column(['Той день', 'Сосни'], ['3.58', '4.31'], song_length)
+    [3.58, 4.31]
+    '''
+    if key is song_length:
+        return list(map(float, length_songs))
+    if key is title_length:
+        return list(map(len, song_titles))
+    if key is last_word:
+        return [el.rsplit(" ", 1)[-1][0] for el in song_titles]
+    return list(map(key, zip(song_titles, length_songs)))
+
+
+def sort_order(song_titles: list[str], length_songs: list[str],
+               keys: list[Callable[[tuple], int | str | float]],
+               reverse: bool | list[bool] = False) -> list[int]:
+    '''Returns the indices of the songs in the sorted order.
+
+    The songs are sorted by the first key, songs with equal first keys by
+    the second one and so on. reverse is either one flag for all keys
+    or a flag per key. Every key column is computed once and the indices
+    are sorted by the columns, from the last key to the first, relying on
+    the stability of sorting.
+
+    >>> sort_order(['Янанебібув', 'Той день', 'Мало мені', 'Сосни'],\
+                   ['3.19', '3.58', '5.06', '3.19'], [song_length, title_length], [False, True])
+    [0, 3, 1, 2]
+    '''
+    if isinstance(reverse, bool):
+        reverse = [reverse] * len(keys)
+    order = list(range(len(song_titles)))
+    for key, descending in reversed(list(zip(keys, reverse))):
+        column = key_column(song_titles, length_songs, key)
+        order.sort(key=column.__getitem__, reverse=descending)
+    return order
+
+
+def sort_songs_by(song_titles: list[str], length_songs: list[str],
+                  keys: list[Callable[[tuple], int | str | float]],
+                  reverse: bool | list[bool] = False) -> list[tuple] | None:
+    '''Sorts songs by several keys, see sort_order.
+
+    Returns:
+    list[tuple[str, str]]]: A sorted list of tuples (song title, song length)
+    or None if input is invalid.
+
+    >>> sort_songs_by(['Янанебібув', 'Той день', 'Мало мені', 'Сосни'],\
+                      ['3.19', '3.58', '5.06', '4.31'], [title_length, last_word], True)
+    [('Янанебібув', '3.19'), ('Мало мені', '5.06'), ('Той день', '3.58'), ('Сосни', '4.31')]
+    '''
+    if len(song_titles) != len(length_songs):
+        return None
+    order = sort_order(song_titles, length_songs, keys, reverse)
+    songs = list(zip(song_titles, length_songs))
+    return [songs[i] for i in order]
+
+
 def sort_songs(
         song_titles: list[str],
         length_songs: list[str],
@@ -74,11 +146,214 @@ def sort_songs(
                    ['3.19', '3.58', '5.06', '4.31'],  song_length)
     [('Янанебібув', '3.19'), ('Той день', '3.58'), ('Сосни', '4.31'), ('Мало мені', '5.06')]
     '''
+    return sort_songs_by(song_titles, length_songs, [key])
+
+
+def top_songs(song_titles: list[str], length_songs: list[str],
+              key: Callable[[tuple], int | str | float], k: int,
+              reverse: bool = False) -> list[tuple] | None:
+    '''Returns the first k songs of sort_songs_by(..., [key], reverse)
+    without sorting all of them: a heap of k songs is kept instead.
+
+    >>> top_songs(['Янанебібув', 'Той день', 'Мало мені', 'Сосни'],\
+                  ['3.19', '3.58', '5.06', '4.31'], song_length, 2, True)
+    [('Мало мені', '5.06'), ('Сосни', '4.31')]
+    '''
     if len(song_titles) != len(length_songs):
         return None
-    arr = [(el, length_songs[i]) for i, el in enumerate(song_titles)]
-    arr = sorted(arr, key = key)
-    return arr
+    select = heapq.nlargest if reverse else heapq.nsmallest
+    return select(k, zip(song_titles, length_songs), key=key)
+
+
+def page_songs(song_titles: list[str], length_songs: list[str],
+               key: Callable[[tuple], int | str | float], page: int,
+               page_size: int = 20, reverse: bool = False) -> list[tuple] | None:
+    '''Returns the page of songs sorted by the key, counting pages from 1.
+
+    >>> page_songs(['Янанебібув', 'Той день', 'Мало мені', 'Сосни'],\
+                   ['3.19', '3.58', '5.06', '4.31'], title_length, 2, 3)
+    [('Янанебібув', '3.19')]
+    '''
+    songs = top_songs(song_titles, length_songs, key, page * page_size, reverse)
+    if songs is None:
+        return None
+    return songs[(page - 1) * page_size:]
+
+
+class _Descending:
+    '''Wraps a key value so that bigger values go first.'''
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+
+class SongIndex:
+    '''Songs with sorted orders cached per key.
+
+    An order is sorted the first time a page by its key is asked for.
+    Songs added later are put into every cached order by a binary search,
+    so the orders are never sorted again and a page costs only its size.
+
+    >>> index = SongIndex(['Янанебібув', 'Той день', 'Мало мені'], ['3.19', '3.58', '5.06'])
+    >>> index.page(song_length, 1, 2)
+    [('Янанебібув', '3.19'), ('Той день', '3.58')]
+    >>> index.add('Сосни', '3.30')
+    >>> index.page(song_length, 1, 2)
+    [('Янанебібув', '3.19'), ('Сосни', '3.30')]
+    >>> index.page(song_length, 2, 2, reverse=True)
+    [('Сосни', '3.30'), ('Янанебібув', '3.19')]
+    '''
+
+    def __init__(self, song_titles: list[str] | None = None,
+                 length_songs: list[str] | None = None):
+        self.song_titles = list(song_titles or [])
+        self.length_songs = list(length_songs or [])
+        if len(self.song_titles) != len(self.length_songs):
+            raise ValueError('song_titles and length_songs differ in length')
+        self.orders = {}
+
+    def __len__(self) -> int:
+        return len(self.song_titles)
+
+    def add(self, title: str, length: str):
+        '''Adds a song and puts it into every cached order.'''
+        i = len(self.song_titles)
+        self.song_titles.append(title)
+        self.length_songs.append(length)
+        for (key, reverse), (sort_keys, order) in self.orders.items():
+            value = key((title, length))
+            entry = (_Descending(value) if reverse else value, i)
+            pos = bisect_right(sort_keys, entry)
+            sort_keys.insert(pos, entry)
+            order.insert(pos, i)
+
+    def order(self, key: Callable[[tuple], int | str | float],
+              reverse: bool = False) -> list[int]:
+        '''Returns the cached order of song indices for the key.'''
+        cached = self.orders.get((key, reverse))
+        if cached is None:
+            column = key_column(self.song_titles, self.length_songs, key)
+            order = list(range(len(column)))
+            order.sort(key=column.__getitem__, reverse=reverse)
+            wrap = _Descending if reverse else lambda value: value
+            sort_keys = [(wrap(column[i]), i) for i in order]
+            cached = self.orders[(key, reverse)] = (sort_keys, order)
+        return cached[1]
+
+    def page(self, key: Callable[[tuple], int | str | float], page: int,
+             page_size: int = 20, reverse: bool = False) -> list[tuple]:
+        '''Returns the page of songs sorted by the key, counting pages from 1.'''
+        order = self.order(key, reverse)
+        return [(self.song_titles[i], self.length_songs[i])
+                for i in order[(page - 1) * page_size:page * page_size]]
+
+
+def read_songs(file_name: str):
+    '''Yields songs (song title, song length) from a file with a song
+    per line, the title and the length separated by a tab.'''
+    with open(file_name, 'r', encoding='utf-8', newline='') as file:
+        for row in csv.reader(file, delimiter='\t'):
+            if row:
+                yield row[0], row[1]
+
+
+def write_songs(songs, file_name: str):
+    '''Writes songs to a file in the format of read_songs.'''
+    with open(file_name, 'w', encoding='utf-8', newline='') as file:
+        csv.writer(file, delimiter='\t').writerows(songs)
+
+
+def _spill(run: list[tuple], temp_dir: str | None):
+    '''Writes a sorted run to a temporary file and returns the file
+    rewound to the start.'''
+    file = tempfile.TemporaryFile('w+', encoding='utf-8', newline='', dir=temp_dir)
+    csv.writer(file, delimiter='\t').writerows(run)
+    file.seek(0)
+    return file
+
+
+def _read_run(file):
+    '''Yields the songs of a run and closes its file at the end.'''
+    with file:
+        for row in csv.reader(file, delimiter='\t'):
+            yield row[0], row[1]
+
+
+def external_sort_songs(songs, key: Callable[[tuple], int | str | float],
+                        reverse: bool = False, memory_limit: int = 64 * 2 ** 20,
+                        temp_dir: str | None = None, stats: dict | None = None):
+    '''Sorts songs that don't fit in memory and yields them in order.
+
+    songs is an iterable of tuples (song title, song length) or the name
+    of a file in the format of read_songs. The songs are read in runs of
+    about memory_limit bytes; every run is sorted with the key and, if
+    there is more than one, written to a temporary file. The runs are
+    then merged. The sort is stable, like sort_songs.
+
+    If stats is a dict, it gets the number of songs and runs, the time
+    in seconds and the songs per second once all songs are yielded.
+
+    >>> list(external_sort_songs([('Янанебібув', '3.19'), ('Той день', '3.58'),\
+                                  ('Мало мені', '5.06'), ('Сосни', '4.31')],\
+                                 song_length, memory_limit=300))
+    [('Янанебібув', '3.19'), ('Той день', '3.58'), ('Сосни', '4.31'), ('Мало мені', '5.06')]
+    '''
+    start = time.perf_counter()
+    if isinstance(songs, str):
+        songs = read_songs(songs)
+    runs, run, size, count = [], [], 0, 0
+    for song in songs:
+        run.append(song)
+        size += sys.getsizeof(song[0]) + sys.getsizeof(song[1]) + 64
+        if size >= memory_limit:
+            runs.append(_spill(sorted(run, key=key, reverse=reverse), temp_dir))
+            count += len(run)
+            run, size = [], 0
+    count += len(run)
+    run.sort(key=key, reverse=reverse)
+    if runs:
+        if run:
+            runs.append(_spill(run, temp_dir))
+        run = []
+        yield from heapq.merge(*map(_read_run, runs), key=key, reverse=reverse)
+    else:
+        yield from run
+    if stats is not None:
+        seconds = time.perf_counter() - start
+        stats.update(songs=count, runs=max(len(runs), 1), seconds=seconds,
+                     songs_per_second=count / seconds if seconds else 0.0)
+
+
+def benchmark_sort_songs(count: int = 10 ** 6) -> dict[str, float]:
+    '''Sorts count random songs by every key of this module and by
+    a composite key (length, then title length descending) with sorted
+    over the song tuples and with sort_songs_by, and returns the time
+    of both in seconds.'''
+    words = ['Той', 'день', 'Мало', 'мені', 'Сосни', 'Янанебібув', 'Обійми']
+    song_titles = [' '.join(random.choices(words, k=random.randint(1, 4)))
+                   for _ in range(count)]
+    length_songs = [f'{random.randint(1, 9)}.{random.randint(0, 59):02}'
+                    for _ in range(count)]
+    cases = [(key, [key], False) for key in (song_length, title_length, last_word)]
+    cases.append((lambda x: (song_length(x), -title_length(x)),
+                  [song_length, title_length], [False, True]))
+    result = {'sorted': 0.0, 'sort_songs_by': 0.0}
+    for key, keys, reverse in cases:
+        start = time.perf_counter()
+        expected = sorted(zip(song_titles, length_songs), key=key)
+        result['sorted'] += time.perf_counter() - start
+        start = time.perf_counter()
+        songs = sort_songs_by(song_titles, length_songs, keys, reverse)
+        result['sort_songs_by'] += time.perf_counter() - start
+        assert songs == expected
+    return result
 
 if __name__ == '__main__':
     import doctest